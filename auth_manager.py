@@ -1,7 +1,6 @@
 import streamlit as st
 import hashlib
 import secrets
-import sqlite3
 from datetime import datetime, timedelta
 import logging
 from typing import Optional, Dict, Any
@@ -19,7 +18,7 @@ class AuthManager:
     def init_auth_tables(self):
         """Initialize authentication tables if they don't exist"""
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Create users table if not exists
@@ -78,7 +77,7 @@ class AuthManager:
     def register_user(self, username: str, email: str, password: str, role: str = "user") -> Dict[str, Any]:
         """Register a new user"""
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Check if username or email already exists
@@ -110,7 +109,7 @@ class AuthManager:
     def login_user(self, username: str, password: str) -> Dict[str, Any]:
         """Authenticate user and create session"""
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Get user by username
@@ -161,7 +160,7 @@ class AuthManager:
     def verify_session(self, session_token: str) -> Optional[Dict[str, Any]]:
         """Verify session token and return user info"""
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Get session with user info
@@ -199,7 +198,7 @@ class AuthManager:
     def logout_user(self, session_token: str) -> bool:
         """Logout user by removing session"""
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM user_sessions WHERE session_token = ?", (session_token,))
                 conn.commit()
@@ -214,7 +213,7 @@ class AuthManager:
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user information by ID"""
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT id, username, email, role, created_at, last_login FROM users WHERE id = ?", (user_id,))
                 user = cursor.fetchone()
@@ -242,7 +241,7 @@ class AuthManager:
             if not admin_user or admin_user["role"] != "admin":
                 return False
             
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("UPDATE users SET role = ? WHERE id = ?", (new_role, user_id))
                 conn.commit()
@@ -257,7 +256,7 @@ class AuthManager:
     def cleanup_expired_sessions(self) -> int:
         """Clean up expired sessions"""
         try:
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("DELETE FROM user_sessions WHERE expires_at < CURRENT_TIMESTAMP")
                 deleted_count = cursor.rowcount
@@ -278,7 +277,7 @@ class AuthManager:
             if not admin_user or admin_user["role"] != "admin":
                 return []
             
-            with sqlite3.connect(self.db_manager.db_path) as conn:
+            with self.db_manager.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT id, username, email, role, created_at, last_login FROM users ORDER BY created_at DESC")
                 users = cursor.fetchall()
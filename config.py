@@ -96,7 +96,8 @@ EXPORT_CONFIG = {
     'default_format': 'excel',
     'supported_formats': ['excel', 'csv'],
     'filename_template': 'bumuk_leads_{timestamp}',
-    'include_metadata': True
+    'include_metadata': True,
+    'max_rows': 500000  # larger exports are split into pages of this many rows
 }
 
 # Sales Team Configuration
@@ -156,6 +157,7 @@ VALIDATION_RULES = {
 DASHBOARD_CONFIG = {
     'refresh_interval': 30,  # seconds
     'max_display_leads': 100,
+    'table_page_size': 50,  # rows sent to the browser per leads table page
     'charts_height': 400,
     'enable_real_time': False
 }
@@ -1,26 +1,33 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 from datetime import datetime, timedelta
+import itertools
 import logging
 import os
-from dotenv import load_dotenv
 import io # Added for export functionality
 
 # Import our custom modules
-from data_cleaner import LeadsDataCleaner
+# (plotly, dotenv and the data cleaner are imported where they are used so the
+# login page doesn't pay for them on a cold start)
 from database_manager import DatabaseManager
 from auth_manager import AuthManager
-from config import LEAD_STATUSES, PRIORITY_LEVELS
-
-# Load environment variables
-load_dotenv()
+from filter_utils import KNOWN_CATEGORIES, categorize_known_columns, equality_mask
+from export_utils import MAX_EXPORT_ROWS, dataframe_fingerprint, export_bytes, export_page, export_page_count
+from config import DASHBOARD_CONFIG, LEAD_STATUSES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# The cleaning steps and lead queries work on shallow copies; Copy-on-Write (always on
+# from pandas 3) copies a column only when it is written to
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Shared random generator for sales team assignment
+rng = np.random.default_rng()
+
 # Page configuration
 st.set_page_config(
     page_title="🏛️ Bumuk Library CRM",
@@ -33,6 +40,11 @@ st.set_page_config(
 @st.cache_resource
 def init_managers():
     """Initialize database and authentication managers"""
+    # Load environment variables once per process rather than on every rerun
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    # Created once per server process, so the tuned connection is shared by all sessions
     db_manager = DatabaseManager()
     auth_manager = AuthManager(db_manager)
     return db_manager, auth_manager
@@ -40,6 +52,281 @@ def init_managers():
 # Initialize managers
 db_manager, auth_manager = init_managers()
 
+@st.cache_resource
+def leads_version_counter():
+    """
+    Process-wide source of leads data versions, so a version used in a cache key never
+    stands for two different states of the data, even across sessions
+    """
+    return itertools.count(1)
+
+def bump_leads_version():
+    """Give the session's leads data a new version; views cached on the old one are not reused"""
+    st.session_state._leads_version = next(leads_version_counter())
+
+@st.cache_data(ttl=60, show_spinner=False)
+def cached_user_stats(user_id, leads_version):
+    """
+    User statistics from the database, cached across reruns; keyed on the leads data
+    version so nothing has to be hashed per rerun
+    """
+    return db_manager.get_user_stats(user_id)
+
+# Shorter database searches match too much to be useful
+MIN_SEARCH_CHARS = 3
+
+@st.cache_data(ttl=60, max_entries=128, show_spinner=False)
+def cached_search_leads(search_term, user_id, leads_version):
+    """Database search results, reused for identical searches of the same leads data version within a minute"""
+    return db_manager.search_leads(search_term, user_id)
+
+OPTION_COLUMNS = ['lead_status', 'priority', 'assigned_to']
+
+# Low-cardinality text columns kept as pandas categoricals in session state
+CATEGORY_COLUMNS = ['lead_status', 'priority', 'assigned_to', 'city']
+
+# Priority choices offered first in the edit form (any other priorities follow them)
+EDIT_PRIORITIES = ['High', 'Medium', 'Low']
+
+def category_options(leads_df, column, default):
+    """Categories of an enum column as an Index (the default values if it isn't categorical)"""
+    if column in leads_df.columns and isinstance(leads_df[column].dtype, pd.CategoricalDtype):
+        return leads_df[column].cat.categories
+    return pd.Index(default)
+
+def option_position(options, value):
+    """Position of value in an options Index via a hash lookup, 0 when it is missing"""
+    try:
+        return int(options.get_loc(value))
+    except (KeyError, TypeError):
+        return 0
+
+def column_list_markdown(columns):
+    """Column names as one markdown bullet list, sent as a single element instead of one per column"""
+    return "\n".join(f"- {col}" for col in columns)
+
+def optimize_dtypes(leads_df):
+    """
+    Store enum-like columns as categoricals, ids as int32 and follow-up dates as datetime64
+    to cut memory and per-rerun work
+    """
+    leads_df = categorize_known_columns(leads_df.copy())
+    for col in CATEGORY_COLUMNS:
+        if col in leads_df.columns and col not in KNOWN_CATEGORIES:
+            leads_df[col] = leads_df[col].astype('category')
+    if 'id' in leads_df.columns and leads_df['id'].notna().all():
+        leads_df['id'] = leads_df['id'].astype('int32')
+    # Parsed once here so the dashboard can compare dates without reparsing strings
+    if 'follow_up_date' in leads_df.columns:
+        leads_df['follow_up_date'] = pd.to_datetime(leads_df['follow_up_date'], errors='coerce')
+    return leads_df
+
+# Datasets at least this large are kept in session state as a compact Arrow table
+ARROW_SESSION_MIN_ROWS = 50_000
+
+def store_leads_data(leads_df):
+    """Replace the session's leads data and bump its version so derived option lists are rebuilt"""
+    leads_df = optimize_dtypes(leads_df)
+    st.session_state.leads_data = leads_df
+    if len(leads_df) >= ARROW_SESSION_MIN_ROWS:
+        import pyarrow as pa
+        try:
+            st.session_state.leads_data = pa.Table.from_pandas(leads_df, preserve_index=False).combine_chunks()
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            # Mixed-type object columns can't be converted; keep the DataFrame as is
+            logger.warning(f"Keeping leads data as a DataFrame: {str(e)}")
+    bump_leads_version()
+
+def session_leads_data():
+    """The session's leads as a DataFrame, materialized from Arrow for large datasets"""
+    leads_data = st.session_state.leads_data
+    if isinstance(leads_data, pd.DataFrame):
+        return leads_data
+    return leads_data.to_pandas()
+
+def session_leads_columns():
+    """Column names of the session's leads without materializing an Arrow-backed dataset"""
+    leads_data = st.session_state.leads_data
+    if isinstance(leads_data, pd.DataFrame):
+        return list(leads_data.columns)
+    return leads_data.column_names
+
+def option_lists(leads_df):
+    """
+    Sorted distinct values of the filter columns, computed once per leads data version
+    and kept in session state
+    """
+    version = st.session_state.get('_leads_version', 0)
+    cached = st.session_state.get('_option_lists')
+    if cached is None or cached['version'] != version:
+        cached = {
+            'version': version,
+            'lists': {
+                col: sorted(leads_df[col].dropna().astype(str).unique().tolist())
+                for col in OPTION_COLUMNS if col in leads_df.columns
+            }
+        }
+        st.session_state._option_lists = cached
+    return cached['lists']
+
+def find_lead(leads_df, lead_id):
+    """
+    Row for a database id via a hash lookup in an id Index built once per leads data
+    version; falls back to the row position when the data has no ids yet
+    """
+    if 'id' not in leads_df.columns:
+        return leads_df.iloc[lead_id] if 0 <= lead_id < len(leads_df) else None
+    
+    try:
+        return leads_df.iloc[lead_id_index(leads_df).get_loc(int(lead_id))]
+    except KeyError:
+        return None
+
+def lead_id_index(leads_df):
+    """Index over the id column, built once per leads data version and kept in session state"""
+    version = st.session_state.get('_leads_version', 0)
+    cached = st.session_state.get('_lead_id_index')
+    if cached is None or cached['version'] != version:
+        cached = {'version': version, 'index': pd.Index(leads_df['id'])}
+        st.session_state._lead_id_index = cached
+    return cached['index']
+
+def status_row_positions(leads_df):
+    """
+    Row positions of each lead status, grouped once per leads data version and kept in
+    session state so the status filter is a direct gather instead of a column scan
+    """
+    version = st.session_state.get('_leads_version', 0)
+    cached = st.session_state.get('_status_rows')
+    if cached is None or cached['version'] != version:
+        cached = {'version': version, 'rows': leads_df.groupby('lead_status', observed=True, sort=False).indices}
+        st.session_state._status_rows = cached
+    return cached['rows']
+
+SEARCH_COLUMNS = ['full_name', 'phone_number', 'email', 'city']
+
+# Columns shown in read-only lead tables; notes, AI text and timestamps stay server-side
+DISPLAY_COLUMNS = ['id', 'full_name', 'phone_number', 'email', 'city', 'lead_status', 'priority', 'assigned_to']
+
+DISPLAY_COLUMN_CONFIG = {'id': st.column_config.NumberColumn("ID", width="small", format="%d")}
+
+def show_leads_table(leads_df):
+    """Render a read-only lead table with only the display columns sent to the browser"""
+    st.dataframe(
+        leads_df[[col for col in DISPLAY_COLUMNS if col in leads_df.columns]],
+        width='stretch',
+        hide_index=True,
+        column_config=DISPLAY_COLUMN_CONFIG
+    )
+
+def search_text(values):
+    """Column values as text, with missing values as empty strings rather than 'nan'"""
+    return values.astype(str).where(values.notna(), '')
+
+@st.cache_data(show_spinner=False, max_entries=8, hash_funcs={pd.DataFrame: dataframe_fingerprint})
+def cached_search_blob(search_df):
+    """
+    Lowercased searchable text per lead from the searched columns, built once per distinct
+    content of those columns instead of on every keystroke
+    """
+    blob = search_text(search_df.iloc[:, 0])
+    for col in search_df.columns[1:]:
+        blob = blob + '\x1f' + search_text(search_df[col])
+    return blob.str.lower()
+
+# Icons shown in front of status and priority values in the leads table
+STATUS_ICONS = {
+    'New Lead': '🟢',
+    'Initial Contact': '🔵',
+    'Follow Up': '🟡',
+    'Qualified': '🟠',
+    'Converted': '🟢',
+    'Lost': '🔴'
+}
+
+PRIORITY_ICONS = {
+    'High': '🔴',
+    'Medium': '🟡',
+    'Low': '🟢'
+}
+
+def format_with_icons(values, icons):
+    """Prefix each value with its icon (⚪ when unknown) using vectorized string ops"""
+    values = values.astype(object)
+    labels = values.astype(str).fillna('')
+    return values.map(icons).fillna('⚪').astype(str) + ' ' + labels
+
+@st.cache_data(show_spinner=False)
+def status_pie_figure(status_counts, title=None):
+    """Pie chart built straight from aggregated (status, count) pairs"""
+    import plotly.graph_objects as go
+    labels, values = zip(*status_counts)
+    fig = go.Figure(go.Pie(labels=list(labels), values=list(values)))
+    fig.update_layout(title=title)
+    return fig
+
+@st.cache_data(show_spinner=False)
+def priority_bar_figure(priority_counts, title=None):
+    """Bar chart built straight from aggregated (priority, count) pairs"""
+    import plotly.graph_objects as go
+    labels, values = zip(*priority_counts)
+    fig = go.Figure(go.Bar(x=list(labels), y=list(values)))
+    fig.update_layout(title=title, xaxis_title="Priority", yaxis_title="Count")
+    return fig
+
+def _series_fingerprint(series):
+    """Content hash of a Series, so cache hits survive reruns but not data changes"""
+    return pd.util.hash_pandas_object(series, index=False).to_numpy().tobytes()
+
+@st.cache_data(show_spinner=False, hash_funcs={pd.Series: _series_fingerprint})
+def daily_lead_counts(dates):
+    """Leads per calendar day as a (date, count) frame, ignoring unparseable dates"""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, errors='coerce', format='mixed', cache=True)
+    return (
+        dates.dropna()
+        .dt.floor('D')
+        .value_counts()
+        .sort_index()
+        .rename_axis('date')
+        .reset_index(name='count')
+    )
+
+def text_value(value):
+    """Widget-safe text for a cell that may be None/NaN"""
+    return '' if pd.isna(value) else str(value)
+
+def queue_lead_update(update):
+    """Add a lead edit to the pending batch, merging it with an earlier edit of the same lead"""
+    pending_updates = st.session_state.setdefault('pending_updates', [])
+    for pending in pending_updates:
+        if pending['id'] == update['id']:
+            pending.update(update)
+            return
+    pending_updates.append(update)
+
+def apply_lead_updates(leads_df, updates):
+    """Copy of leads_df with saved per-lead edits applied, matching leads on the id column"""
+    leads_df = leads_df.copy()
+    positions = lead_id_index(leads_df).get_indexer([int(update['id']) for update in updates])
+    for field in dict.fromkeys(field for update in updates for field in update if field != 'id'):
+        edited = [(position, update[field]) for position, update in zip(positions, updates) if field in update and position >= 0]
+        if not edited:
+            continue
+        # Edited values may be new categories; store_leads_data re-categorizes the column
+        column = leads_df[field].astype(object) if field in leads_df.columns else pd.Series(None, index=leads_df.index, dtype=object)
+        rows, values = zip(*edited)
+        column.iloc[list(rows)] = list(values)
+        leads_df[field] = column
+    return leads_df
+
+def clear_cached_views():
+    """
+    Stop reusing cached stats, searches and option lists after the leads data changes; they
+    are keyed on the leads data version, so other sessions' cache entries are left alone
+    """
+    bump_leads_version()
+
 def main():
     """Main application function"""
     
@@ -188,7 +475,7 @@ def show_main_app():
         
         # Add helpful information about data flow
         if 'data_loaded' in st.session_state and st.session_state.data_loaded:
-            if 'leads_data' in st.session_state and 'id' in st.session_state.leads_data.columns:
+            if 'leads_data' in st.session_state and 'id' in session_leads_columns():
                 st.success("✅ **Database Ready**: Your leads have database IDs and can be updated!")
             else:
                 st.warning("⚠️ **Action Required**: Click '💾 Save Current Data' to enable status updates.")
@@ -197,15 +484,14 @@ def show_main_app():
             if 'leads_data' in st.session_state:
                 try:
                     user_id = st.session_state.user_info['user_id']
-                    success = db_manager.save_leads_data(st.session_state.leads_data, user_id)
-                    if success:
+                    leads_df = session_leads_data()
+                    lead_ids = db_manager.save_leads_data(leads_df, user_id)
+                    if lead_ids is not None:
                         st.success("✅ Data saved successfully!")
-                        # Reload data to get database IDs
-                        saved_data = db_manager.load_leads_data(user_id)
-                        if not saved_data.empty:
-                            st.session_state.leads_data = saved_data
-                            st.info("🔄 **Refreshing**: Data reloaded with database IDs. Status updates should now work!")
-                            st.rerun()
+                        # Attach the database IDs to the data already in memory
+                        store_leads_data(leads_df.assign(id=lead_ids))
+                        st.info("🔄 **Refreshing**: Data updated with database IDs. Status updates should now work!")
+                        st.rerun()
                     else:
                         st.error("❌ Failed to save data")
                 except Exception as e:
@@ -219,7 +505,7 @@ def show_main_app():
                 user_id = st.session_state.user_info['user_id']
                 saved_data = db_manager.load_leads_data(user_id)
                 if not saved_data.empty:
-                    st.session_state.leads_data = saved_data
+                    store_leads_data(saved_data)
                     st.session_state.data_loaded = True
                     st.success(f"✅ Loaded {len(saved_data)} saved leads")
                     st.rerun()
@@ -234,6 +520,9 @@ def show_main_app():
                 del st.session_state.leads_data
             if 'data_loaded' in st.session_state:
                 del st.session_state.data_loaded
+            if 'filters' in st.session_state:
+                del st.session_state.filters
+            clear_cached_views()
             st.success("✅ All data cleared! Returning to welcome screen.")
             st.rerun()
     
@@ -255,59 +544,49 @@ def process_uploaded_file(uploaded_file, enable_ai, sales_team):
         status_text.text("📁 Preparing file...")
         progress_bar.progress(10)
         
-        # Save uploaded file temporarily
-        import tempfile
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.xlsx') as tmp_file:
-            tmp_file.write(uploaded_file.getbuffer())
-            temp_path = tmp_file.name
+        # Parse the upload straight from memory; no temp file needed
+        upload_buffer = io.BytesIO(uploaded_file.getbuffer())
         
         progress_bar.progress(20)
         status_text.text("🔍 Loading Excel sheets...")
         
         # Initialize data cleaner
-        cleaner = LeadsDataCleaner()
+        from data_cleaner import LeadsDataCleaner
+        cleaner = LeadsDataCleaner(db_manager=db_manager)
         
         # Load and clean data
-        leads_df = cleaner.clean_all_data(temp_path, enable_ai_enrichment=enable_ai)
+        leads_df = cleaner.clean_all_data(upload_buffer, enable_ai_enrichment=enable_ai)
         
         progress_bar.progress(70)
         status_text.text("👥 Assigning leads to sales team...")
         
         # Assign leads to sales team
         if sales_team and len(sales_team) > 0:
-            import random
-            leads_df['assigned_to'] = [random.choice(sales_team) for _ in range(len(leads_df))]
+            team = np.asarray(sales_team)
+            leads_df['assigned_to'] = team[rng.integers(0, len(team), len(leads_df))]
         
         progress_bar.progress(90)
         status_text.text("💾 Saving to database...")
         
         # Save to database FIRST to get database IDs
         user_id = st.session_state.user_info['user_id']
-        save_success = db_manager.save_leads_data(leads_df, user_id)
+        lead_ids = db_manager.save_leads_data(leads_df, user_id)
         
-        if save_success:
-            # Reload data from database to get the database IDs
-            leads_df_with_ids = db_manager.load_leads_data(user_id)
+        if lead_ids is not None:
+            # Attach the database IDs directly instead of re-reading what was just written
+            leads_df['id'] = lead_ids
+            store_leads_data(leads_df)
+            st.session_state.data_loaded = True
             
-            if not leads_df_with_ids.empty:
-                # Store in session state with database IDs
-                st.session_state.leads_data = leads_df_with_ids
-                st.session_state.data_loaded = True
-                
-                progress_bar.progress(100)
-                status_text.text("✅ Data processing complete!")
-                
-                st.success(f"🎉 Successfully processed and saved {len(leads_df_with_ids)} leads!")
-                st.info("💡 **Tip**: Your leads are now saved with database IDs and ready for status updates!")
-                st.rerun()
-            else:
-                st.error("❌ Failed to load saved data from database")
+            progress_bar.progress(100)
+            status_text.text("✅ Data processing complete!")
+            
+            st.success(f"🎉 Successfully processed and saved {len(leads_df)} leads!")
+            st.info("💡 **Tip**: Your leads are now saved with database IDs and ready for status updates!")
+            st.rerun()
         else:
             st.error("❌ Failed to save data to database")
         
-        # Clean up temp file
-        os.unlink(temp_path)
-        
     except Exception as e:
         st.error(f"❌ Error processing file: {str(e)}")
         logger.error(f"File processing error: {str(e)}")
@@ -372,7 +651,7 @@ def display_welcome_screen():
                 user_id = st.session_state.user_info['user_id']
                 saved_data = db_manager.load_leads_data(user_id)
                 if not saved_data.empty:
-                    st.session_state.leads_data = saved_data
+                    store_leads_data(saved_data)
                     st.session_state.data_loaded = True
                     st.success(f"✅ Loaded {len(saved_data)} saved leads")
                     st.rerun()
@@ -383,7 +662,7 @@ def display_welcome_screen():
 
 def display_crm_dashboard():
     """Display the main CRM dashboard"""
-    leads_df = st.session_state.leads_data
+    leads_df = session_leads_data()
     user_id = st.session_state.user_info['user_id']
     
     # Top metrics row
@@ -438,7 +717,7 @@ def display_dashboard_tab(leads_df, user_id):
     st.header("📊 Sales Pipeline Dashboard")
     
     # Get user statistics
-    user_stats = db_manager.get_user_stats(user_id)
+    user_stats = cached_user_stats(user_id, st.session_state.get('_leads_version', 0))
     
     # Two columns for charts
     col1, col2 = st.columns(2)
@@ -446,8 +725,7 @@ def display_dashboard_tab(leads_df, user_id):
     with col1:
         st.subheader("📊 Lead Status Distribution")
         if user_stats.get('status_counts'):
-            status_data = pd.DataFrame(list(user_stats['status_counts'].items()), columns=['Status', 'Count'])
-            fig = px.pie(status_data, values='Count', names='Status', title="Leads by Status")
+            fig = status_pie_figure(tuple(user_stats['status_counts'].items()), title="Leads by Status")
             st.plotly_chart(fig, width='stretch')
         else:
             st.info("No status data available")
@@ -455,8 +733,7 @@ def display_dashboard_tab(leads_df, user_id):
     with col2:
         st.subheader("🎯 Priority Distribution")
         if user_stats.get('priority_counts'):
-            priority_data = pd.DataFrame(list(user_stats['priority_counts'].items()), columns=['Priority', 'Count'])
-            fig = px.bar(priority_data, x='Priority', y='Count', title="Leads by Priority")
+            fig = priority_bar_figure(tuple(user_stats['priority_counts'].items()), title="Leads by Priority")
             st.plotly_chart(fig, width='stretch')
         else:
             st.info("No priority data available")
@@ -467,11 +744,10 @@ def display_dashboard_tab(leads_df, user_id):
     # Get leads needing follow-up (with proper error handling)
     if 'follow_up_date' in leads_df.columns:
         try:
-            # Clean and convert follow_up_date column
-            follow_up_dates = leads_df['follow_up_date'].copy()
-            
-            # Convert to datetime, handling errors
-            follow_up_dates = pd.to_datetime(follow_up_dates, errors='coerce')
+            # Already datetime64 for data stored via store_leads_data
+            follow_up_dates = leads_df['follow_up_date']
+            if not pd.api.types.is_datetime64_any_dtype(follow_up_dates):
+                follow_up_dates = pd.to_datetime(follow_up_dates, errors='coerce')
             
             # Filter out invalid dates and get today's date
             valid_dates = follow_up_dates.notna()
@@ -485,14 +761,28 @@ def display_dashboard_tab(leads_df, user_id):
                 if not follow_up_leads.empty:
                     st.warning(f"⚠️ {len(follow_up_leads)} leads need follow-up today")
                     
+                    # Summarize by owner and status; raw rows only on demand
+                    group_columns = [col for col in ['assigned_to', 'lead_status'] if col in follow_up_leads.columns]
+                    if group_columns:
+                        summary = (
+                            follow_up_leads.groupby(group_columns, observed=True, dropna=False)
+                            .size()
+                            .reset_index(name='count')
+                        )
+                        st.dataframe(summary, width='stretch', hide_index=True)
+                    
                     # Show relevant columns safely
                     display_columns = ['full_name', 'phone_number', 'lead_status']
                     available_columns = [col for col in display_columns if col in follow_up_leads.columns]
                     
-                    if available_columns:
-                        st.dataframe(follow_up_leads[available_columns], width='stretch')
-                    else:
-                        st.write("Follow-up leads found but no displayable columns available")
+                    # A toggle rather than an expander: expander contents are sent even when collapsed
+                    if st.toggle("Show details", key="follow_up_details"):
+                        if available_columns:
+                            st.dataframe(follow_up_leads[available_columns].head(100), width='stretch')
+                            if len(follow_up_leads) > 100:
+                                st.caption(f"Showing the first 100 of {len(follow_up_leads)} leads")
+                        else:
+                            st.write("Follow-up leads found but no displayable columns available")
                 else:
                     st.success("✅ No leads need follow-up today")
             else:
@@ -515,133 +805,71 @@ def display_leads_management_tab(leads_df, user_id):
     # ===== SEARCH AND FILTER BAR =====
     st.subheader("🔍 Search & Filter")
     
-    col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
-    
-    with col1:
-        search_term = st.text_input("🔍 Search all fields", placeholder="Search by name, phone, email, city...", key="search_leads")
-    
-    with col2:
-        # Safe status filter
-        if 'lead_status' in leads_df.columns and not leads_df['lead_status'].empty:
-            status_options = ["All"] + [str(s) for s in leads_df['lead_status'].dropna().unique() if pd.notna(s)]
-        else:
-            status_options = ["All"]
-        status_filter = st.selectbox("📊 Status", status_options, key="status_filter")
-    
-    with col3:
-        # Safe priority filter
-        if 'priority' in leads_df.columns and not leads_df['priority'].empty:
-            priority_options = ["All"] + [str(p) for p in leads_df['priority'].dropna().unique() if pd.notna(p)]
-        else:
-            priority_options = ["All"]
-        priority_filter = st.selectbox("🎯 Priority", priority_options, key="priority_filter")
-    
-    with col4:
-        # Safe assigned filter
-        if 'assigned_to' in leads_df.columns and not leads_df['assigned_to'].empty:
-            assigned_options = ["All"] + [str(a) for a in leads_df['assigned_to'].dropna().unique() if pd.notna(a)]
-        else:
-            assigned_options = ["All"]
-        assigned_filter = st.selectbox("👤 Assigned To", assigned_options, key="assigned_filter")
-    
-    # ===== APPLY FILTERS =====
-    filtered_df = leads_df.copy()
-    
-    if search_term:
-        # Safe search with proper data type handling
-        search_mask = pd.Series([False] * len(filtered_df), index=filtered_df.index)
+    # Filters live in a form so typing doesn't rerun the app; only submitted values are applied
+    options = option_lists(leads_df)
+    with st.form("leads_filter_form", clear_on_submit=False):
+        col1, col2, col3, col4 = st.columns([3, 2, 2, 2])
         
-        # Search in full_name
-        if 'full_name' in filtered_df.columns:
-            name_col = filtered_df['full_name'].astype(str)
-            search_mask |= name_col.str.contains(search_term, case=False, na=False)
+        with col1:
+            search_input = st.text_input("🔍 Search all fields", placeholder="Search by name, phone, email, city...", key="search_leads")
         
-        # Search in phone_number
-        if 'phone_number' in filtered_df.columns:
-            phone_col = filtered_df['phone_number'].astype(str)
-            search_mask |= phone_col.str.contains(search_term, case=False, na=False)
+        with col2:
+            # Safe status filter
+            status_options = ["All"] + options.get('lead_status', [])
+            status_input = st.selectbox("📊 Status", status_options, key="status_filter")
         
-        # Search in email
-        if 'email' in filtered_df.columns:
-            email_col = filtered_df['email'].astype(str)
-            search_mask |= email_col.str.contains(search_term, case=False, na=False)
+        with col3:
+            # Safe priority filter
+            priority_options = ["All"] + options.get('priority', [])
+            priority_input = st.selectbox("🎯 Priority", priority_options, key="priority_filter")
         
-        # Search in city
-        if 'city' in filtered_df.columns:
-            city_col = filtered_df['city'].astype(str)
-            search_mask |= city_col.str.contains(search_term, case=False, na=False)
+        with col4:
+            # Safe assigned filter
+            assigned_options = ["All"] + options.get('assigned_to', [])
+            assigned_input = st.selectbox("👤 Assigned To", assigned_options, key="assigned_filter")
         
-        filtered_df = filtered_df[search_mask]
+        if st.form_submit_button("🔍 Apply Filters"):
+            st.session_state.filters = {
+                'search': search_input,
+                'status': status_input,
+                'priority': priority_input,
+                'assigned_to': assigned_input
+            }
+    
+    filters = st.session_state.get('filters', {})
+    search_term = filters.get('search', '')
+    status_filter = filters.get('status', "All")
+    priority_filter = filters.get('priority', "All")
+    assigned_filter = filters.get('assigned_to', "All")
     
-    if status_filter != "All":
-        if 'lead_status' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['lead_status'] == status_filter]
+    # ===== APPLY FILTERS =====
+    # Accumulate one boolean mask and slice the frame once
+    mask = np.ones(len(leads_df), dtype=bool)
+    
+    if search_term:
+        # Single pass over the precomputed name/phone/email/city text
+        search_columns = [col for col in SEARCH_COLUMNS if col in leads_df.columns]
+        if search_columns:
+            search_blob = cached_search_blob(leads_df[search_columns])
+            mask &= search_blob.str.contains(search_term.lower(), regex=False, na=False).to_numpy(dtype=bool)
+        else:
+            mask[:] = False
     
-    if priority_filter != "All":
-        if 'priority' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['priority'] == priority_filter]
+    column_filters = [('priority', priority_filter), ('assigned_to', assigned_filter)]
+    mask &= equality_mask(leads_df, {col: value for col, value in column_filters if value != "All"})
     
-    if assigned_filter != "All":
-        if 'assigned_to' in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df['assigned_to'] == assigned_filter]
+    if status_filter != "All" and 'lead_status' in leads_df.columns:
+        rows = status_row_positions(leads_df).get(status_filter, np.empty(0, dtype=np.intp))
+        filtered_df = leads_df.take(rows[mask[rows]])
+    else:
+        filtered_df = leads_df.loc[mask]
     
     # ===== BULK OPERATIONS =====
     st.subheader("📋 Bulk Operations")
     
-    # Initialize selection state in session
-    if 'selected_leads_indices' not in st.session_state:
-        st.session_state.selected_leads_indices = set()
-    
-    # Checkbox for selecting all visible leads
+    # Checkbox for selecting all visible leads; single rows are ticked in the table below
     select_all = st.checkbox("☑️ Select All Visible Leads", key="select_all_leads")
     
-    # Handle select all functionality
-    if select_all:
-        st.session_state.selected_leads_indices = set(filtered_df.index.tolist())
-    else:
-        # If unchecking select all, clear all selections
-        if len(st.session_state.selected_leads_indices) == len(filtered_df):
-            st.session_state.selected_leads_indices.clear()
-    
-    # Show individual checkboxes for first 10 leads (to avoid clutter)
-    if len(filtered_df) <= 10:
-        st.write("**Select individual leads:**")
-        col1, col2, col3, col4, col5 = st.columns(5)
-        cols = [col1, col2, col3, col4, col5]
-        
-        for idx, (_, lead) in enumerate(filtered_df.iterrows()):
-            col_idx = idx % 5
-            with cols[col_idx]:
-                lead_name = lead.get('full_name', f'Lead {idx+1}')
-                if st.checkbox(
-                    f"☑️ {lead_name[:20]}...",
-                    value=idx in st.session_state.selected_leads_indices,
-                    key=f"select_lead_{idx}"
-                ):
-                    st.session_state.selected_leads_indices.add(idx)
-                else:
-                    if idx in st.session_state.selected_leads_indices:
-                        st.session_state.selected_leads_indices.remove(idx)
-    else:
-        st.write(f"**Showing selection for first 10 of {len(filtered_df)} leads**")
-        col1, col2, col3, col4, col5 = st.columns(5)
-        cols = [col1, col2, col3, col4, col5]
-        
-        for idx in range(min(10, len(filtered_df))):
-            col_idx = idx % 5
-            with cols[col_idx]:
-                lead = filtered_df.iloc[idx]
-                lead_name = lead.get('full_name', f'Lead {idx+1}')
-                if st.checkbox(
-                    f"☑️ {lead_name[:20]}...",
-                    value=idx in st.session_state.selected_leads_indices,
-                    key=f"select_lead_{idx}"
-                ):
-                    st.session_state.selected_leads_indices.add(idx)
-                else:
-                    if idx in st.session_state.selected_leads_indices:
-                        st.session_state.selected_leads_indices.remove(idx)
-    
     # Bulk actions
     col1, col2, col3, col4 = st.columns([2, 2, 2, 2])
     
@@ -653,79 +881,43 @@ def display_leads_management_tab(leads_df, user_id):
     
     with col3:
         # Safe bulk assignment
-        if 'assigned_to' in leads_df.columns and not leads_df['assigned_to'].empty:
-            assigned_options = ["Select Person"] + [str(a) for a in leads_df['assigned_to'].dropna().unique() if pd.notna(a)]
-        else:
-            assigned_options = ["Select Person"]
+        assigned_options = ["Select Person"] + options.get('assigned_to', [])
         bulk_assigned = st.selectbox("👤 Bulk Assignment", assigned_options, key="bulk_assigned")
     
     with col4:
-        if st.button("🚀 Apply Bulk Updates", type="primary"):
-            if st.session_state.selected_leads_indices:
-                # Apply bulk updates
-                update_count = 0
-                for idx in st.session_state.selected_leads_indices:
-                    lead_id = filtered_df.loc[idx, 'id'] if 'id' in filtered_df.columns else idx
-                    success = True
-                    
-                    if bulk_status != "Select Status":
-                        success &= db_manager.update_lead_status(lead_id, bulk_status, "Bulk status update", user_id)
-                    
-                    # Update other fields if needed
-                    if success and (bulk_priority != "Select Priority" or bulk_assigned != "Select Person"):
-                        # This would require additional database update methods
-                        pass
-                    
-                    if success:
-                        update_count += 1
-                
-                if update_count > 0:
-                    st.success(f"✅ Successfully updated {update_count} leads!")
-                    # Clear selections after successful update
-                    st.session_state.selected_leads_indices.clear()
-                    st.rerun()
-                else:
-                    st.error("❌ Failed to update leads")
-            else:
-                st.warning("⚠️ Please select leads for bulk update")
+        apply_bulk = st.button("🚀 Apply Bulk Updates", type="primary")
+        # Filled in once the table below has reported which rows are ticked
+        bulk_feedback = st.container()
     
     # ===== LEADS TABLE =====
     st.subheader(f"📊 Leads Table ({len(filtered_df)} leads)")
     
     if filtered_df.empty:
         st.info("🔍 No leads match your search criteria. Try adjusting your filters.")
+        if apply_bulk:
+            bulk_feedback.warning("⚠️ Please select leads for bulk update")
         return
     
-    # Prepare table data for display
-    display_df = filtered_df.copy()
-    
-    # Format status with colors
-    def format_status(status):
-        status_colors = {
-            'New Lead': '🟢',
-            'Initial Contact': '🔵',
-            'Follow Up': '🟡',
-            'Qualified': '🟠',
-            'Converted': '🟢',
-            'Lost': '🔴'
-        }
-        return f"{status_colors.get(status, '⚪')} {status}"
-    
-    display_df['Status'] = display_df['lead_status'].apply(format_status)
+    # Only the current page is formatted and sent to the browser
+    page_size = DASHBOARD_CONFIG['table_page_size']
+    n_pages = max(1, (len(filtered_df) + page_size - 1) // page_size)
+    if st.session_state.get('leads_table_page', 1) > n_pages:
+        # Filters shrank the result set below the remembered page
+        st.session_state.leads_table_page = n_pages
+    # No value argument: the page comes from session state (min_value on first render)
+    page = st.number_input("Page", min_value=1, max_value=n_pages, key="leads_table_page") - 1
+    st.caption(f"Page {page + 1} of {n_pages}")
     
-    # Format priority with colors
-    def format_priority(priority):
-        priority_colors = {
-            'High': '🔴',
-            'Medium': '🟡',
-            'Low': '🟢'
-        }
-        return f"{priority_colors.get(priority, '⚪')} {priority}"
+    # Prepare table data for display
+    display_df = filtered_df.iloc[page * page_size:(page + 1) * page_size].copy()
     
-    display_df['Priority'] = display_df['priority'].apply(format_priority)
+    # Format status and priority with colors
+    display_df['Status'] = format_with_icons(display_df['lead_status'], STATUS_ICONS)
+    display_df['Priority'] = format_with_icons(display_df['priority'], PRIORITY_ICONS)
     
-    # Remove the Select column since we're using individual checkboxes above
-    columns_to_show = ['full_name', 'phone_number', 'email', 'city', 'Status', 'Priority', 'assigned_to', 'lead_date']
+    # Selection checkboxes live in the table itself
+    display_df['Select'] = False
+    columns_to_show = ['Select', 'full_name', 'phone_number', 'email', 'city', 'Status', 'Priority', 'assigned_to', 'lead_date']
     
     # Check which columns actually exist in the dataframe
     available_columns = []
@@ -763,12 +955,20 @@ def display_leads_management_tab(leads_df, user_id):
     
     # Only show columns that exist
     display_df = display_df[available_columns].rename(columns=column_mapping)
+    for col in display_df.select_dtypes('category').columns:
+        display_df[col] = display_df[col].astype(object)
     
-    # Display the table with selection capability
-    st.dataframe(
+    # Editor state is per page and filter set so ticks don't carry over to other rows
+    filter_key = abs(hash(tuple(sorted(st.session_state.get('filters', {}).items()))))
+    editor_key = f"leads_editor_{page}_{filter_key}"
+    
+    # Display the table with selection capability; only the Select column is editable
+    edited_df = st.data_editor(
         display_df,
         width='stretch',
         hide_index=True,
+        disabled=[col for col in display_df.columns if col != '☑️'],
+        key=editor_key,
         column_config={
             "☑️": st.column_config.CheckboxColumn("Select", help="Select for bulk operations", default=False),
             "👤 Name": st.column_config.TextColumn("Name", width="medium"),
@@ -782,43 +982,122 @@ def display_leads_management_tab(leads_df, user_id):
         }
     )
     
+    if select_all:
+        # Only the rows on the current page are visible, so only those are selected
+        selected_index = edited_df.index
+    else:
+        selected_index = edited_df.index[edited_df['☑️'].to_numpy(dtype=bool)]
+    
     # Show selection summary
-    if st.session_state.selected_leads_indices:
-        st.info(f"☑️ **{len(st.session_state.selected_leads_indices)} leads selected** for bulk operations")
+    if len(selected_index):
+        st.info(f"☑️ **{len(selected_index)} leads selected** for bulk operations")
+    
+    if apply_bulk:
+        with bulk_feedback:
+            if len(selected_index):
+                # Apply bulk updates in a single transaction
+                if 'id' in filtered_df.columns:
+                    lead_ids = filtered_df.loc[selected_index, 'id'].astype(int).tolist()
+                else:
+                    lead_ids = selected_index.tolist()
+                
+                if bulk_status != "Select Status":
+                    update_count = db_manager.bulk_update_lead_status(lead_ids, bulk_status, "Bulk status update", user_id)
+                else:
+                    update_count = len(lead_ids)
+                
+                # Update other fields if needed
+                if update_count and (bulk_priority != "Select Priority" or bulk_assigned != "Select Person"):
+                    # This would require additional database update methods
+                    pass
+                
+                if update_count > 0:
+                    clear_cached_views()
+                    st.success(f"✅ Successfully updated {update_count} leads!")
+                    # Clear selections after successful update
+                    st.session_state.pop(editor_key, None)
+                    st.rerun()
+                else:
+                    st.error("❌ Failed to update leads")
+            else:
+                st.warning("⚠️ Please select leads for bulk update")
     
     # ===== INDIVIDUAL LEAD EDITING =====
-    st.subheader("✏️ Edit Individual Lead")
+    lead_edit_panel(leads_df, filtered_df, user_id)
+    
+    # ===== EXPORT FUNCTIONALITY =====
+    st.subheader("📤 Export Data")
     
-    # Lead selection for editing
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        if 'id' in filtered_df.columns:
-            available_ids = filtered_df['id'].dropna().astype(int).tolist()
-            if available_ids:
-                edit_lead_id = st.selectbox("Select Lead ID to Edit", available_ids, key="edit_lead_select")
-            else:
-                edit_lead_id = st.number_input("Lead ID", min_value=0, max_value=len(filtered_df)-1, value=0, key="edit_lead_input")
-        else:
-            edit_lead_id = st.number_input("Lead Index", min_value=0, max_value=len(filtered_df)-1, value=0, key="edit_lead_input")
+        export_format = st.selectbox("Export Format", ["CSV", "Excel"], key="export_format")
+        # Narrow by default so large free-text columns (e.g. AI insights) are only exported on request
+        default_columns = [col for col in DISPLAY_COLUMNS if col in filtered_df.columns] or list(filtered_df.columns)
+        export_columns = st.multiselect("Columns", list(filtered_df.columns), default=default_columns, key="export_columns")
+        export_page_number = select_export_page(len(filtered_df), key="leads_export_page")
     
     with col2:
-        if st.button("🔍 Load Lead for Editing", type="secondary"):
-            st.session_state.editing_lead_id = edit_lead_id
-            st.rerun()
+        if not export_columns:
+            st.warning("⚠️ Please select at least one column to export")
+        else:
+            # The file is only generated when the download is clicked, not on every rerun
+            def export_data():
+                try:
+                    export_df = export_page(filtered_df, export_page_number)[export_columns]
+                    if export_format == "CSV":
+                        return export_csv_bytes(export_df)
+                    return export_excel_bytes(export_df)
+                except Exception as e:
+                    # Streamlit calls can't be made from here, so the failure is only logged
+                    logger.error(f"Filtered leads export failed: {str(e)}")
+                    raise
+            
+            extension, mime = ("csv", "text/csv") if export_format == "CSV" else (
+                "xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+            )
+            st.download_button(
+                label=f"📥 Download {export_format}",
+                data=export_data,
+                file_name=f"leads_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}",
+                mime=mime,
+                on_click="ignore"
+            )
+
+@st.fragment
+def lead_edit_panel(leads_df, filtered_df, user_id):
+    """
+    Single-lead editing, quick status updates and the pending-updates batch. Runs as a
+    fragment so loading a lead or queueing an edit doesn't re-render the leads table;
+    only saving the batch reruns the whole app
+    """
+    st.subheader("✏️ Edit Individual Lead")
+    
+    # Lead selection for editing (in a form so picking an id doesn't rerun the app)
+    with st.form("edit_lead_select_form"):
+        col1, col2 = st.columns([2, 1])
+        
+        with col1:
+            if 'id' in filtered_df.columns:
+                # Only ids of visible leads can be picked; None when the filters match nothing
+                available_ids = filtered_df['id'].dropna().astype(int).tolist()
+                edit_lead_id = st.selectbox("Select Lead ID to Edit", available_ids, key="edit_lead_select")
+            else:
+                edit_lead_id = st.number_input("Lead Index", min_value=0, max_value=max(len(filtered_df) - 1, 0), value=0, key="edit_lead_input")
+        
+        with col2:
+            # The edit form below reads this in the same run, so no rerun is needed
+            if st.form_submit_button("🔍 Load Lead for Editing", type="secondary") and edit_lead_id is not None:
+                st.session_state.editing_lead_id = edit_lead_id
     
     # Display edit form if lead is selected
-    if hasattr(st.session_state, 'editing_lead_id') and st.session_state.editing_lead_id is not None:
-        edit_id = st.session_state.editing_lead_id
+    edit_id = st.session_state.get('editing_lead_id')
+    if edit_id is not None:
         
         # Find the lead to edit
-        if 'id' in filtered_df.columns:
-            lead_to_edit = filtered_df[filtered_df['id'] == edit_id]
-        else:
-            lead_to_edit = filtered_df.iloc[[edit_id]]
+        lead_row = find_lead(leads_df, edit_id)
         
-        if not lead_to_edit.empty:
-            lead_row = lead_to_edit.iloc[0]
+        if lead_row is not None:
             
             st.write(f"**Editing Lead: {lead_row.get('full_name', 'Unknown')}**")
             
@@ -827,32 +1106,45 @@ def display_leads_management_tab(leads_df, user_id):
                 col1, col2 = st.columns(2)
                 
                 with col1:
-                    new_name = st.text_input("Full Name", value=lead_row.get('full_name', ''), key=f"edit_name_{edit_id}")
-                    new_phone = st.text_input("Phone Number", value=lead_row.get('phone_number', ''), key=f"edit_phone_{edit_id}")
-                    new_email = st.text_input("Email", value=lead_row.get('email', ''), key=f"edit_email_{edit_id}")
-                    new_city = st.text_input("City", value=lead_row.get('city', ''), key=f"edit_city_{edit_id}")
+                    new_name = st.text_input("Full Name", value=text_value(lead_row.get('full_name')), key=f"edit_name_{edit_id}")
+                    new_phone = st.text_input("Phone Number", value=text_value(lead_row.get('phone_number')), key=f"edit_phone_{edit_id}")
+                    new_email = st.text_input("Email", value=text_value(lead_row.get('email')), key=f"edit_email_{edit_id}")
+                    new_city = st.text_input("City", value=text_value(lead_row.get('city')), key=f"edit_city_{edit_id}")
                 
                 with col2:
-                    new_status = st.selectbox("Status", LEAD_STATUSES, index=LEAD_STATUSES.index(lead_row.get('lead_status', 'New Lead')), key=f"edit_status_{edit_id}")
-                    new_priority = st.selectbox("Priority", ["High", "Medium", "Low"], index=["High", "Medium", "Low"].index(lead_row.get('priority', 'Medium')), key=f"edit_priority_{edit_id}")
-                    new_assigned = st.text_input("Assigned To", value=lead_row.get('assigned_to', ''), key=f"edit_assigned_{edit_id}")
-                    new_notes = st.text_area("Notes", value=lead_row.get('notes', ''), key=f"edit_notes_{edit_id}")
+                    status_options = category_options(leads_df, 'lead_status', LEAD_STATUSES)
+                    priority_options = pd.Index(EDIT_PRIORITIES).union(category_options(leads_df, 'priority', EDIT_PRIORITIES), sort=False)
+                    new_status = st.selectbox("Status", status_options.tolist(), index=option_position(status_options, lead_row.get('lead_status', 'New Lead')), key=f"edit_status_{edit_id}")
+                    new_priority = st.selectbox("Priority", priority_options.tolist(), index=option_position(priority_options, lead_row.get('priority', 'Medium')), key=f"edit_priority_{edit_id}")
+                    new_assigned = st.text_input("Assigned To", value=text_value(lead_row.get('assigned_to')), key=f"edit_assigned_{edit_id}")
+                    new_notes = st.text_area("Notes", value=text_value(lead_row.get('notes')), key=f"edit_notes_{edit_id}")
                 
                 col1, col2, col3 = st.columns([1, 1, 1])
                 
                 with col1:
                     if st.form_submit_button("💾 Save Changes", type="primary"):
                         try:
-                            # Update status if changed
-                            if new_status != lead_row.get('lead_status'):
-                                success = db_manager.update_lead_status(edit_id, new_status, new_notes, user_id)
-                                if success:
-                                    st.success(f"✅ Lead {edit_id} updated successfully!")
-                                    # Clear editing state
-                                    st.session_state.editing_lead_id = None
-                                    st.rerun()
-                                else:
-                                    st.error("❌ Failed to update lead status")
+                            # Queue every changed field as one pending row update
+                            edited_values = {
+                                'full_name': new_name,
+                                'phone_number': new_phone,
+                                'email': new_email,
+                                'city': new_city,
+                                'lead_status': new_status,
+                                'priority': new_priority,
+                                'assigned_to': new_assigned,
+                                'notes': new_notes
+                            }
+                            changes = {
+                                field: value for field, value in edited_values.items()
+                                if value != text_value(lead_row.get(field))
+                            }
+                            if changes:
+                                queue_lead_update({'id': int(edit_id), **changes})
+                                st.success(f"✅ Changes to lead {edit_id} queued")
+                                # Clear editing state
+                                st.session_state.editing_lead_id = None
+                                st.rerun(scope="fragment")
                             else:
                                 st.success("✅ No changes to save")
                         except Exception as e:
@@ -861,7 +1153,7 @@ def display_leads_management_tab(leads_df, user_id):
                 with col2:
                     if st.form_submit_button("❌ Cancel", type="secondary"):
                         st.session_state.editing_lead_id = None
-                        st.rerun()
+                        st.rerun(scope="fragment")
                 
                 with col3:
                     if st.form_submit_button("🗑️ Delete Lead", type="secondary"):
@@ -870,66 +1162,86 @@ def display_leads_management_tab(leads_df, user_id):
     # ===== QUICK STATUS UPDATE =====
     st.subheader("⚡ Quick Status Update")
     
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        quick_lead_id = st.number_input("Lead ID", min_value=0, max_value=len(leads_df)-1, value=0, key="quick_lead_id")
-    
-    with col2:
-        quick_status = st.selectbox("New Status", LEAD_STATUSES, key="quick_status")
-    
-    with col3:
-        quick_notes = st.text_input("Notes", placeholder="Quick update notes...", key="quick_notes")
-    
-    if st.button("🚀 Quick Update", type="primary"):
-        try:
-            if 'id' in leads_df.columns:
-                # Use database ID
-                success = db_manager.update_lead_status(quick_lead_id, quick_status, quick_notes, user_id)
-                if success:
-                    st.success(f"✅ Lead {quick_lead_id} status updated to {quick_status}")
-                    st.rerun()
-                else:
-                    st.error("❌ Failed to update lead status")
+    # Typing notes shouldn't rerun the app; everything is read on submit
+    with st.form("quick_update_form"):
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            # Database ids aren't row positions, so the input isn't capped; ids are checked on submit
+            quick_lead_id = st.number_input("Lead ID", min_value=1, value=1, step=1, key="quick_lead_id")
+        
+        with col2:
+            quick_status = st.selectbox("New Status", LEAD_STATUSES, key="quick_status")
+        
+        with col3:
+            quick_notes = st.text_input("Notes", placeholder="Quick update notes...", key="quick_notes")
+        
+        quick_submitted = st.form_submit_button("🚀 Quick Update", type="primary")
+    
+    if quick_submitted:
+        if 'id' in leads_df.columns:
+            # Use database ID, checked against the cached id Index before anything is queued
+            if int(quick_lead_id) in lead_id_index(leads_df):
+                queue_lead_update({'id': int(quick_lead_id), 'lead_status': quick_status, 'notes': quick_notes})
+                st.success(f"✅ Status update for lead {quick_lead_id} queued")
             else:
-                st.warning("⚠️ Database ID not available for quick updates")
-        except Exception as e:
-            st.error(f"❌ Error: {str(e)}")
-    
-    # ===== EXPORT FUNCTIONALITY =====
-    st.subheader("📤 Export Data")
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        export_format = st.selectbox("Export Format", ["CSV", "Excel"], key="export_format")
+                st.error(f"❌ Lead {quick_lead_id} not found")
+        else:
+            st.warning("⚠️ Database ID not available for quick updates")
     
-    with col2:
-        if st.button("📥 Export Filtered Leads", type="secondary"):
-            try:
-                if export_format == "CSV":
-                    csv = filtered_df.to_csv(index=False)
-                    st.download_button(
-                        label="📥 Download CSV",
-                        data=csv,
-                        file_name=f"leads_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                        mime="text/csv"
-                    )
-                else:  # Excel
-                    # Create Excel file in memory
-                    output = io.BytesIO()
-                    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                        filtered_df.to_excel(writer, index=False, sheet_name='Leads')
-                    output.seek(0)
-                    
-                    st.download_button(
-                        label="📥 Download Excel",
-                        data=output.getvalue(),
-                        file_name=f"leads_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                    )
-            except Exception as e:
-                st.error(f"❌ Export failed: {str(e)}")
+    # ===== PENDING UPDATES =====
+    pending_updates = st.session_state.get('pending_updates', [])
+    if pending_updates:
+        st.subheader("📝 Pending Updates")
+        st.info(f"📝 **{len(pending_updates)} lead updates** waiting to be saved")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            if st.button(f"💾 Save {len(pending_updates)} Pending Updates", type="primary"):
+                try:
+                    update_count = db_manager.bulk_update_leads(pending_updates, user_id)
+                    if update_count > 0:
+                        # Keep the session's leads in step with the database, so later edits
+                        # are compared against the saved values
+                        store_leads_data(apply_lead_updates(session_leads_data(), pending_updates))
+                        st.session_state.pending_updates = []
+                        st.success(f"✅ Saved updates for {update_count} leads!")
+                        st.rerun()
+                    else:
+                        st.error("❌ Failed to save pending updates")
+                except Exception as e:
+                    st.error(f"❌ Error: {str(e)}")
+        
+        with col2:
+            if st.button("🗑️ Discard Pending Updates", type="secondary"):
+                st.session_state.pending_updates = []
+                st.rerun(scope="fragment")
+
+@st.cache_data(ttl=300, max_entries=8, show_spinner=False, hash_funcs={pd.DataFrame: dataframe_fingerprint})
+def export_csv_bytes(export_df):
+    """CSV bytes for a frame; repeated exports of the same rows are served from cache"""
+    return export_bytes(export_df, 'csv')
+
+@st.cache_data(ttl=300, max_entries=8, show_spinner=False, hash_funcs={pd.DataFrame: dataframe_fingerprint})
+def export_excel_bytes(export_df):
+    """Excel bytes for a frame; repeated exports of the same rows are served from cache"""
+    return export_bytes(export_df, 'excel')
+
+@st.cache_data(ttl=120, max_entries=8, show_spinner=False)
+def cached_report_bytes(user_id, export_format, page, leads_version):
+    """In-memory export of the user's saved leads, reused by repeat downloads of unchanged data"""
+    return db_manager.export_leads_bytes(user_id, export_format, page=page)
+
+def select_export_page(total_rows, key):
+    """Page picker for exports larger than MAX_EXPORT_ROWS; returns the 1-based page"""
+    n_pages = export_page_count(total_rows)
+    if n_pages == 1:
+        return 1
+    
+    logger.warning(f"Export of {total_rows} rows exceeds the {MAX_EXPORT_ROWS} row cap, split into {n_pages} pages")
+    st.warning(f"⚠️ {total_rows:,} rows exceed the {MAX_EXPORT_ROWS:,} row export limit; choose a page to download")
+    return st.selectbox("Page", range(1, n_pages + 1), key=key)
 
 def display_search_filter_tab(leads_df, user_id):
     """Display search and filter interface"""
@@ -939,11 +1251,13 @@ def display_search_filter_tab(leads_df, user_id):
     st.subheader("🔍 Search Leads")
     search_term = st.text_input("Search by name, phone, or email", placeholder="Enter search term...")
     
-    if search_term:
-        search_results = db_manager.search_leads(search_term, user_id)
+    if search_term and len(search_term.strip()) < MIN_SEARCH_CHARS:
+        st.caption(f"Type at least {MIN_SEARCH_CHARS} characters to search")
+    elif search_term:
+        search_results = cached_search_leads(search_term.strip(), user_id, st.session_state.get('_leads_version', 0))
         if not search_results.empty:
             st.success(f"🔍 Found {len(search_results)} matching leads")
-            st.dataframe(search_results, width='stretch')
+            show_leads_table(search_results)
         else:
             st.info("No leads found matching your search term")
     
@@ -954,17 +1268,18 @@ def display_search_filter_tab(leads_df, user_id):
     if status_filter != "All":
         filtered_df = leads_df[leads_df['lead_status'] == status_filter]
         st.write(f"**Leads with status: {status_filter}**")
-        st.dataframe(filtered_df, width='stretch')
+        show_leads_table(filtered_df)
     else:
         st.write("**All Leads**")
-        st.dataframe(leads_df, width='stretch')
+        show_leads_table(leads_df)
 
 def display_analytics_tab(leads_df, user_id):
     """Display analytics and insights"""
     st.header("📈 Analytics & Insights")
+    import plotly.express as px
     
     # Get user statistics
-    user_stats = db_manager.get_user_stats(user_id)
+    user_stats = cached_user_stats(user_id, st.session_state.get('_leads_version', 0))
     
     if user_stats:
         col1, col2 = st.columns(2)
@@ -972,15 +1287,13 @@ def display_analytics_tab(leads_df, user_id):
         with col1:
             st.subheader("📊 Lead Status Overview")
             if user_stats.get('status_counts'):
-                status_data = pd.DataFrame(list(user_stats['status_counts'].items()), columns=['Status', 'Count'])
-                fig = px.pie(status_data, values='Count', names='Status')
+                fig = status_pie_figure(tuple(user_stats['status_counts'].items()))
                 st.plotly_chart(fig, width='stretch')
         
         with col2:
             st.subheader("🎯 Priority Distribution")
             if user_stats.get('priority_counts'):
-                priority_data = pd.DataFrame(list(user_stats['priority_counts'].items()), columns=['Priority', 'Count'])
-                fig = px.bar(priority_data, x='Priority', y='Count')
+                fig = priority_bar_figure(tuple(user_stats['priority_counts'].items()))
                 st.plotly_chart(fig, width='stretch')
     
     # Time-based analysis (with safe date handling)
@@ -988,34 +1301,21 @@ def display_analytics_tab(leads_df, user_id):
     
     # Check for various possible date columns
     date_columns = ['created_at', 'created_date', 'lead_date', 'date']
-    found_date_column = None
-    
-    for col in date_columns:
-        if col in leads_df.columns:
-            found_date_column = col
-            break
+    found_date_column = next((col for col in date_columns if col in leads_df.columns), None)
     
     if found_date_column:
         try:
-            # Safely convert dates
-            date_series = pd.to_datetime(leads_df[found_date_column], errors='coerce')
-            valid_dates = date_series.notna()
+            # Parsed and aggregated once per distinct date column
+            daily_leads_df = daily_lead_counts(leads_df[found_date_column])
             
-            if valid_dates.any():
-                # Create daily leads count
-                daily_leads = date_series[valid_dates].dt.date.value_counts().sort_index()
-                daily_leads_df = pd.DataFrame({
-                    'date': daily_leads.index,
-                    'count': daily_leads.values
-                })
-                
+            if not daily_leads_df.empty:
                 # Create the chart
                 fig = px.line(daily_leads_df, x='date', y='count', 
                             title=f"Daily Lead Creation ({found_date_column})")
                 st.plotly_chart(fig, width='stretch')
                 
                 # Show summary stats
-                st.write(f"**Date Range**: {daily_leads_df['date'].min()} to {daily_leads_df['date'].max()}")
+                st.write(f"**Date Range**: {daily_leads_df['date'].min().date()} to {daily_leads_df['date'].max().date()}")
                 st.write(f"**Total Days with Leads**: {len(daily_leads_df)}")
                 st.write(f"**Average Leads per Day**: {daily_leads_df['count'].mean():.1f}")
             else:
@@ -1026,8 +1326,7 @@ def display_analytics_tab(leads_df, user_id):
     else:
         st.info("ℹ️ No date columns found for time-based analysis")
         st.write("**Available columns for analysis:**")
-        for col in leads_df.columns:
-            st.write(f"• {col}")
+        st.markdown(column_list_markdown(leads_df.columns))
 
 def display_ai_insights_tab(leads_df):
     """Display AI insights and recommendations"""
@@ -1036,12 +1335,17 @@ def display_ai_insights_tab(leads_df):
     if 'ai_insights' in leads_df.columns:
         st.write("**AI-Generated Insights for Your Leads**")
         
-        # Show sample insights
-        sample_insights = leads_df[leads_df['ai_insights'].notna()].head(5)
-        if not sample_insights.empty:
-            for _, lead in sample_insights.iterrows():
-                with st.expander(f"💡 {lead.get('full_name', 'Unknown')}"):
-                    st.write(lead.get('ai_insights', 'No insights available'))
+        # Show sample insights (only the two needed columns of the first rows are read)
+        sample_rows = np.flatnonzero(leads_df['ai_insights'].notna().to_numpy())[:5]
+        if len(sample_rows):
+            insights = leads_df['ai_insights'].iloc[sample_rows]
+            if 'full_name' in leads_df.columns:
+                names = leads_df['full_name'].iloc[sample_rows]
+            else:
+                names = [None] * len(sample_rows)
+            for name, insight in zip(names, insights):
+                with st.expander(f"💡 {text_value(name) or 'Unknown'}"):
+                    st.write(insight or 'No insights available')
         else:
             st.info("No AI insights available. Enable AI enrichment to get insights.")
     else:
@@ -1059,29 +1363,37 @@ def display_export_tab(leads_df, user_id):
     
     st.write("**Export your leads data in various formats**")
     
+    export_panel(leads_df, user_id)
+
+@st.fragment
+def export_panel(leads_df, user_id):
+    """Export controls and summary; reruns on its own when its widgets change"""
     col1, col2 = st.columns(2)
     
     with col1:
         st.subheader("📊 Export Options")
         
         export_format = st.selectbox("Select Format", ["CSV", "Excel"])
+        page = select_export_page(len(leads_df), key="report_export_page")
         
         if st.button(f"📥 Export as {export_format}"):
             try:
-                filename = db_manager.export_leads_report(user_id, export_format.lower())
-                if filename and not filename.startswith("Export failed"):
-                    st.success(f"✅ Data exported successfully to {filename}")
+                # Built in memory and handed to the download button without a file round trip
+                export = cached_report_bytes(user_id, export_format.lower(), page, st.session_state.get('_leads_version', 0))
+                if export:
+                    extension, data = export
+                    st.success(f"✅ Data exported successfully ({len(data):,} bytes)")
                     
                     # Provide download link
-                    with open(filename, "rb") as file:
-                        st.download_button(
-                            label=f"📥 Download {export_format} File",
-                            data=file.read(),
-                            file_name=filename,
-                            mime="application/octet-stream"
-                        )
+                    page_suffix = f"_part{page}" if export_page_count(len(leads_df)) > 1 else ""
+                    st.download_button(
+                        label=f"📥 Download {export_format} File",
+                        data=data,
+                        file_name=f"leads_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}{page_suffix}.{extension}",
+                        mime="application/octet-stream"
+                    )
                 else:
-                    st.error(f"❌ {filename}")
+                    st.error("❌ Export failed: no saved leads to export")
             except Exception as e:
                 st.error(f"❌ Export failed: {str(e)}")
     
@@ -1091,8 +1403,7 @@ def display_export_tab(leads_df, user_id):
         
         if not leads_df.empty:
             st.write("**Data Columns Available:**")
-            for col in leads_df.columns:
-                st.write(f"• {col}")
+            st.markdown(column_list_markdown(leads_df.columns))
         else:
             st.info("No data available for export")
 
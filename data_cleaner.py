@@ -1,31 +1,249 @@
 import pandas as pd
 import numpy as np
+import asyncio
+import json
 import re
-from datetime import datetime
+import hashlib
+import importlib.util
 import logging
-import openai
 import os
-from typing import Optional, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+from export_utils import CSV_WRITE_CHUNK_ROWS, evict_cache_entries, private_cache_dir, touch_cache_entry, write_excel
+from filter_utils import categorize_known_columns
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# python-calamine (Rust workbook reader, pandas>=2.2) is optional; openpyxl/xlrd are the fallback
+CALAMINE_AVAILABLE = importlib.util.find_spec('python_calamine') is not None
+
+def open_excel_file(file_path) -> pd.ExcelFile:
+    """Open a workbook with the calamine engine when installed, else pandas' default engine"""
+    if CALAMINE_AVAILABLE:
+        try:
+            return pd.ExcelFile(file_path, engine='calamine')
+        except (ImportError, ValueError) as e:
+            logger.warning(f"Calamine could not open workbook, falling back to default engine: {str(e)}")
+            if hasattr(file_path, 'seek'):
+                file_path.seek(0)
+    return pd.ExcelFile(file_path)
+
+# Text is kept in Arrow-backed string columns when pyarrow is installed (it ships with
+# streamlit), so the .str cleaning steps run on Arrow compute kernels instead of Python objects
+TEXT_DTYPE = pd.StringDtype('pyarrow') if importlib.util.find_spec('pyarrow') is not None else str
+
+def as_text(values: pd.Series) -> pd.Series:
+    """Values as strings; columns that already have a string dtype are returned as they are"""
+    if isinstance(values.dtype, pd.StringDtype):
+        return values
+    return values.astype(TEXT_DTYPE)
+
+def to_arrow_strings(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert object columns that only hold text to TEXT_DTYPE"""
+    for col in df.columns[(df.dtypes == object).to_numpy()]:
+        if not isinstance(df[col], pd.DataFrame) and pd.api.types.infer_dtype(df[col], skipna=True) == 'string':
+            df[col] = df[col].astype(TEXT_DTYPE)
+    return df
+
+# orjson parses and serializes JSON faster than the stdlib module (which is the fallback)
+ORJSON_AVAILABLE = importlib.util.find_spec('orjson') is not None
+if ORJSON_AVAILABLE:
+    import orjson
+    json_loads = orjson.loads
+    json_dumps_bytes = orjson.dumps
+else:
+    json_loads = json.loads
+    
+    def json_dumps_bytes(obj) -> bytes:
+        """UTF-8 encoded JSON for obj"""
+        return json.dumps(obj).encode('utf-8')
+
+# Upper bound on simultaneous OpenAI requests during bulk enrichment
+AI_MAX_CONCURRENT_REQUESTS = 20
+
+# OpenAI Batch API jobs are polled this often, and abandoned (falling back to direct
+# requests) if they haven't finished within the timeout
+AI_BATCH_POLL_SECONDS = 15
+AI_BATCH_TIMEOUT_SECONDS = 30 * 60
+
+# Retries the OpenAI client makes on rate limits (429) and server errors; it backs off
+# exponentially and honours the Retry-After header
+AI_MAX_RETRIES = 5
+
+# Seconds before a single OpenAI request is abandoned (and retried)
+AI_REQUEST_TIMEOUT_SECONDS = 30
+
+# Model and sampling settings for enrichment requests. JSON mode guarantees a parseable
+# answer and the short token cap keeps each response (and its latency) small
+AI_MODEL = 'gpt-4o-mini'
+AI_ENRICHMENT_PARAMS = {
+    'model': AI_MODEL,
+    'max_tokens': 150,
+    'temperature': 0,
+    'response_format': {'type': 'json_object'}
+}
+
+# Instructions shared by every enrichment request. Sent as a fixed system message ahead of
+# the per-lead details, so the identical prefix can be served from OpenAI's prompt cache
+AI_SYSTEM_PROMPT = (
+    "You profile leads for a library business. Reply with JSON: "
+    "customer_segment (parent/student/professional/senior/family/individual), "
+    "potential_value (Low/Medium/High), engagement_strategy (one sentence), "
+    "library_benefits (3 short strings)."
+)
+
+def enrichment_messages(prompt: str) -> List[Dict[str, str]]:
+    """Chat messages for one lead: the shared system instructions plus the lead's details"""
+    return [
+        {'role': 'system', 'content': AI_SYSTEM_PROMPT},
+        {'role': 'user', 'content': prompt}
+    ]
+
+# Model answers by ai_cache_key, shared by every cleaner in the process; the database's
+# ai_cache table (when a DatabaseManager is given) keeps them across restarts
+AI_ANSWER_CACHE: Dict[str, str] = {}
+
+def ai_cache_key(prompt: str) -> str:
+    """Cache key for a model answer: hash of the model, the system instructions and the prompt"""
+    return hashlib.blake2b(f"{AI_MODEL}\n{AI_SYSTEM_PROMPT}\n{prompt}".encode('utf-8'), digest_size=16).hexdigest()
+
+# Parsed workbooks are cached as Parquet, keyed by a hash of the workbook bytes
+SHEET_CACHE_NAME = 'sheets'
+
+# Part of every sheet cache key; bump it when loading or standardizing sheets changes, so
+# workbooks parsed by the old code are parsed again
+SHEET_CACHE_VERSION = 1
+
+def workbook_digest(file_path, sheet_name=None) -> str:
+    """Content hash of a workbook (path or binary file-like object) plus the requested sheet"""
+    digest = hashlib.sha256()
+    digest.update(f"{SHEET_CACHE_VERSION}\n".encode())
+    if hasattr(file_path, 'getbuffer'):
+        digest.update(file_path.getbuffer())
+    elif hasattr(file_path, 'read'):
+        digest.update(file_path.read())
+        file_path.seek(0)
+    else:
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    digest.update(repr(sheet_name).encode())
+    return digest.hexdigest()[:32]
+
+# Standard lead columns and the header keywords that map to them, in priority order
+COLUMN_KEYWORDS = [
+    ('full_name', ['name', 'full_name', 'first_name', 'last_name']),
+    ('phone_number', ['phone', 'mobile', 'telephone', 'contact', 'number']),
+    ('email', ['email', 'e-mail', 'mail']),
+    ('city', ['city', 'town', 'location']),
+    ('lead_date', ['date', 'created', 'timestamp', 'contacted']),
+    ('status', ['status', 'lead_status', 'stage', 'response']),
+    ('lead_source', ['source', 'lead_source', 'origin']),
+    ('child_age', ['age', 'child_age', 'group']),
+    ('lead_type', ['type', 'lead_type']),
+    ('notes', ['notes', 'comments', 'description'])
+]
+
+# One compiled pattern for all targets: each alternative is a lookahead for that target's
+# keywords tried in list order, so the first matching target wins and is its lastgroup
+COLUMN_CLASSIFIER = re.compile('|'.join(
+    f"(?=.*(?:{'|'.join(map(re.escape, keywords))}))(?P<{target}>)"
+    for target, keywords in COLUMN_KEYWORDS
+), re.DOTALL)
+
+# Patterns for the .str cleaning steps, kept as plain strings: Arrow-backed string columns
+# on pandas 2 reject compiled patterns in .str.match and fall back to Python for them in .str.replace
+
+# Anything that isn't a digit, stripped from phone numbers
+NON_DIGIT_PATTERN = r'\D'
+
+# Basic email validation, applied after trimming and lowercasing
+EMAIL_PATTERN = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+# Runs of whitespace collapsed to a single space in names
+WHITESPACE_PATTERN = r'\s+'
+
+# Points per filled-in field when choosing which duplicate record to keep
+COMPLETENESS_WEIGHTS = {'phone_number': 40, 'email': 35, 'city': 15, 'full_name': 10}
+
+# Points per filled-in contact field in the lead score (profile fields add 10 more)
+LEAD_SCORE_WEIGHTS = {'phone_number': 40, 'email': 35, 'city': 15}
+
+def filled_mask(df: pd.DataFrame, column: str) -> np.ndarray:
+    """True where column holds a non-blank value; all False when the column is missing"""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    values = df[column]
+    filled = values.notna()
+    filled[filled] = as_text(values[filled]).str.strip() != ''
+    return filled.to_numpy(dtype=bool)
+
+def weighted_field_score(df: pd.DataFrame, weights: Dict[str, int]) -> np.ndarray:
+    """Sum of the weights of the fields each row has filled in, computed column by column"""
+    score = np.zeros(len(df), dtype=np.int16)
+    for column, weight in weights.items():
+        score += filled_mask(df, column) * np.int16(weight)
+    return score
+
+# Free-text columns stored as categoricals when they repeat enough (distinct/rows below the ratio)
+CATEGORY_CANDIDATES = ['source_sheet', 'lead_source', 'lead_type', 'city', 'child_age', 'status']
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+# Header characters turned into underscores, and anything else that is dropped from headers
+COLUMN_SEPARATOR_RE = re.compile(r'[ \n\r\t]')
+COLUMN_SPECIAL_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+def deduplicate_names(columns, separator: str = '_') -> list:
+    """
+    Make column names unique: repeats get their occurrence number appended (name, name_1,
+    name_2, ...), and any suffixed name that collides with an existing one gets _col_<position>
+    """
+    names = pd.Series(list(columns), dtype=object)
+    occurrence = names.groupby(names, dropna=False, sort=False).cumcount()
+    names = names.where(occurrence == 0, names.astype(str) + separator + occurrence.astype(str))
+    collisions = pd.Index(names).duplicated()
+    if collisions.any():
+        positions = pd.Series(range(len(names)), dtype=object).astype(str)
+        names[collisions] = names[collisions].astype(str) + '_col_' + positions[collisions]
+    return names.tolist()
+
+# Date-like columns kept by clean_column_names even when mostly empty
+IMPORTANT_COLUMN_RE = re.compile('date|created|timestamp|date_contacted|lead_date|contact_date')
+
 class LeadsDataCleaner:
     """
     Comprehensive data cleaning class for Bumuk Library leads data
     """
     
-    def __init__(self):
+    def __init__(self, db_manager=None):
         self.cleaned_data = None
         self.cleaning_log = []
+        self.openai_api_key = None
+        self.openai_client = None
+        # Optional DatabaseManager used to persist AI answers between runs
+        self.db_manager = db_manager
         
     def load_excel_data(self, file_path, sheet_name=None):
         """
-        Load data from Excel file - can load specific sheet or all sheets
+        Load data from Excel file - can load specific sheet or all sheets.
+        file_path may be a path or a binary file-like object (e.g. an uploaded file buffer)
         """
         try:
-            excel_file = pd.ExcelFile(file_path)
+            # An identical workbook parsed before is read back from the Parquet cache
+            cache_path = os.path.join(private_cache_dir(SHEET_CACHE_NAME), f"{workbook_digest(file_path, sheet_name)}.parquet")
+            if os.path.exists(cache_path):
+                try:
+                    df = pd.read_parquet(cache_path)
+                    touch_cache_entry(cache_path)
+                    logger.info(f"Loaded {len(df)} rows from sheet cache {cache_path}")
+                    return df
+                except Exception as e:
+                    logger.warning(f"Ignoring unreadable sheet cache {cache_path}: {str(e)}")
+            
+            excel_file = open_excel_file(file_path)
             sheet_names = excel_file.sheet_names
             
             logger.info(f"Available sheets: {sheet_names}")
@@ -33,149 +251,137 @@ class LeadsDataCleaner:
             if sheet_name:
                 if sheet_name not in sheet_names:
                     raise ValueError(f"Sheet '{sheet_name}' not found. Available sheets: {sheet_names}")
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
+                df = excel_file.parse(sheet_name)
                 logger.info(f"Loaded sheet: {sheet_name}")
             else:
-                # Load all sheets and combine them
-                all_dfs = []
-                for sheet in sheet_names:
-                    try:
-                        sheet_df = pd.read_excel(file_path, sheet_name=sheet)
-                        if not sheet_df.empty:
-                            # Ensure all columns are Series, not DataFrames
-                            for col in sheet_df.columns:
-                                if isinstance(sheet_df[col], pd.DataFrame):
-                                    # If a column is a DataFrame, flatten it
-                                    logger.warning(f"Column '{col}' in sheet '{sheet}' is a DataFrame, flattening...")
-                                    # Take the first column of the DataFrame
-                                    sheet_df[col] = sheet_df[col].iloc[:, 0]
-                            
-                            sheet_df['source_sheet'] = sheet
-                            all_dfs.append(sheet_df)
-                            logger.info(f"Loaded sheet '{sheet}' with {len(sheet_df)} rows")
-                    except Exception as e:
-                        logger.warning(f"Could not load sheet '{sheet}': {str(e)}")
+                # Load all sheets and combine them. Column names are standardized before
+                # concatenation to avoid misalignment; each sheet goes to a worker as soon as it
+                # is parsed, so parsing the next sheet overlaps standardizing the previous one
+                # and raw sheet frames aren't all held until the end
+                logger.info("Loading and standardizing sheets...")
+                standardized = []
+                with ThreadPoolExecutor(max_workers=max(1, min(len(sheet_names), os.cpu_count() or 1))) as executor:
+                    for sheet in sheet_names:
+                        try:
+                            sheet_df = excel_file.parse(sheet)
+                            if not sheet_df.empty:
+                                # Keep the first of any repeated header so every column is a
+                                # Series; standardized sheets then have unique columns, which
+                                # concatenation preserves
+                                duplicated = sheet_df.columns.duplicated()
+                                if duplicated.any():
+                                    logger.warning(f"Dropping repeated columns in sheet '{sheet}': {list(sheet_df.columns[duplicated])}")
+                                    sheet_df = sheet_df.loc[:, ~duplicated]
+                                
+                                sheet_df['source_sheet'] = sheet
+                                standardized.append(executor.submit(self._standardize_sheet, sheet_df))
+                                logger.info(f"Loaded sheet '{sheet}' with {len(sheet_df)} rows")
+                        except Exception as e:
+                            logger.warning(f"Could not load sheet '{sheet}': {str(e)}")
+                    
+                    # Results are collected in sheet order
+                    standardized_dfs = [future.result() for future in standardized]
                 
-                if not all_dfs:
+                if not standardized_dfs:
                     raise ValueError("No valid data found in any sheet")
                 
-                # Standardize column names before concatenation to avoid misalignment
-                logger.info("Standardizing column names before concatenation...")
-                standardized_dfs = []
-                
-                for sheet_df in all_dfs:
-                    # Create a standardized version of each sheet
-                    std_df = pd.DataFrame()
-                    
-                    # Map columns to standard names based on content and position
-                    for col in sheet_df.columns:
-                        col_str = str(col).lower().strip()
-                        
-                        # Map to standard column names
-                        if any(name in col_str for name in ['name', 'full_name', 'first_name', 'last_name']):
-                            std_df['full_name'] = sheet_df[col]
-                        elif any(name in col_str for name in ['phone', 'mobile', 'telephone', 'contact', 'number']):
-                            std_df['phone_number'] = sheet_df[col]
-                        elif any(name in col_str for name in ['email', 'e-mail', 'mail']):
-                            std_df['email'] = sheet_df[col]
-                        elif any(name in col_str for name in ['city', 'town', 'location']):
-                            std_df['city'] = sheet_df[col]
-                        elif any(name in col_str for name in ['date', 'created', 'timestamp', 'contacted']):
-                            std_df['lead_date'] = sheet_df[col]
-                        elif any(name in col_str for name in ['status', 'lead_status', 'stage', 'response']):
-                            std_df['status'] = sheet_df[col]
-                        elif any(name in col_str for name in ['source', 'lead_source', 'origin']):
-                            std_df['lead_source'] = sheet_df[col]
-                        elif any(name in col_str for name in ['age', 'child_age', 'group']):
-                            std_df['child_age'] = sheet_df[col]
-                        elif any(name in col_str for name in ['type', 'lead_type']):
-                            std_df['lead_type'] = sheet_df[col]
-                        elif any(name in col_str for name in ['notes', 'comments', 'description']):
-                            std_df['notes'] = sheet_df[col]
-                        else:
-                            # Keep other columns with original names
-                            std_df[col] = sheet_df[col]
-                    
-                    # Special handling for sheets with different structures
-                    sheet_name = sheet_df.get('source_sheet', 'unknown')
-                    if 'brightr lead' in str(sheet_name):
-                        # Handle brightr lead sheet specifically
-                        if 'Unnamed: 0' in sheet_df.columns:
-                            std_df['full_name'] = sheet_df['Unnamed: 0']
-                        if 'Number ' in sheet_df.columns:
-                            std_df['phone_number'] = sheet_df['Number ']
-                        if 'Any response ' in sheet_df.columns:
-                            std_df['status'] = sheet_df['Any response ']
-                        if 'Date contacted ' in sheet_df.columns:
-                            std_df['lead_date'] = sheet_df['Date contacted ']
-                        if 'Age group ' in sheet_df.columns:
-                            std_df['child_age'] = sheet_df['Age group ']
-                    
-                    # Add source sheet information
-                    std_df['source_sheet'] = sheet_df.get('source_sheet', 'unknown')
-                    standardized_dfs.append(std_df)
-                    logger.info(f"Standardized sheet with columns: {list(std_df.columns)}")
-                
                 # Combine standardized sheets
                 df = pd.concat(standardized_dfs, ignore_index=True)
                 logger.info(f"Combined {len(standardized_dfs)} standardized sheets into single dataset")
-                
-                # Ensure all columns are Series, not DataFrames
-                logger.info("Checking for DataFrame columns after concatenation...")
-                for col in df.columns:
-                    if isinstance(df[col], pd.DataFrame):
-                        logger.warning(f"Column '{col}' is a DataFrame after concatenation, flattening...")
-                        df[col] = df[col].iloc[:, 0]
-                
-                logger.info("All columns are now Series")
+            
+            df = to_arrow_strings(df)
             
             logger.info(f"Final data shape: {df.shape}")
             logger.info(f"Columns: {list(df.columns)}")
             
+            self._write_sheet_cache(df, cache_path)
             return df
             
         except Exception as e:
             logger.error(f"Error loading Excel file: {str(e)}")
             raise
     
+    def _write_sheet_cache(self, df: pd.DataFrame, cache_path: str):
+        """Store a parsed workbook as Parquet; frames Arrow can't represent are just not cached"""
+        partial_path = f"{cache_path}.partial"
+        try:
+            df.to_parquet(partial_path, compression='zstd')
+            os.replace(partial_path, cache_path)
+            evict_cache_entries(os.path.dirname(cache_path))
+            logger.info(f"Wrote sheet cache {cache_path}")
+        except Exception as e:
+            logger.warning(f"Could not cache parsed workbook: {str(e)}")
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+    
+    def _standardize_sheet(self, sheet_df: pd.DataFrame) -> pd.DataFrame:
+        """Map one sheet's columns to the standard lead column names"""
+        # Collect columns in a dict and build the frame once instead of inserting one by one
+        std_df = {}
+        
+        # Map columns to standard names based on content and position
+        for col in sheet_df.columns:
+            col_str = str(col).lower().strip()
+        
+            # Map to standard column names; other columns keep their original names
+            match = COLUMN_CLASSIFIER.match(col_str)
+            std_df[match.lastgroup if match else col] = sheet_df[col]
+        
+        # Special handling for sheets with different structures
+        sheet_name = sheet_df.get('source_sheet', 'unknown')
+        if 'brightr lead' in str(sheet_name):
+            # Handle brightr lead sheet specifically
+            if 'Unnamed: 0' in sheet_df.columns:
+                std_df['full_name'] = sheet_df['Unnamed: 0']
+            if 'Number ' in sheet_df.columns:
+                std_df['phone_number'] = sheet_df['Number ']
+            if 'Any response ' in sheet_df.columns:
+                std_df['status'] = sheet_df['Any response ']
+            if 'Date contacted ' in sheet_df.columns:
+                std_df['lead_date'] = sheet_df['Date contacted ']
+            if 'Age group ' in sheet_df.columns:
+                std_df['child_age'] = sheet_df['Age group ']
+        
+        # Add source sheet information
+        std_df['source_sheet'] = sheet_df.get('source_sheet', 'unknown')
+        std_df = pd.DataFrame(std_df, index=sheet_df.index)
+        logger.info(f"Standardized sheet with columns: {list(std_df.columns)}")
+        return std_df
+    
     def clean_column_names(self, df):
         """
         Clean and standardize column names, and automatically remove problematic columns
         """
-        cleaned_df = df.copy()
+        cleaned_df = df.copy(deep=False)
+        
+        # Missing/blank masks for the whole frame, computed once and shared by steps 1 and 2
+        missing = cleaned_df.isna()
+        empty_string = cleaned_df.isin([''])
         
         # Step 1: Remove completely empty columns
         logger.info("Step 1: Removing completely empty columns...")
-        empty_columns = []
-        for col in cleaned_df.columns:
-            if cleaned_df[col].isna().all() or (cleaned_df[col] == '').all():
-                empty_columns.append(col)
+        is_empty = (missing.all() | empty_string.all()).to_numpy()
+        empty_columns = cleaned_df.columns[is_empty].tolist()
         
         if empty_columns:
             logger.info(f"Removing {len(empty_columns)} completely empty columns: {empty_columns}")
-            cleaned_df = cleaned_df.drop(columns=empty_columns)
         
         # Step 2: Remove columns with only None/NaN values (95%+ empty)
         logger.info("Step 2: Removing columns with no meaningful data...")
-        meaningless_columns = []
-        important_columns = ['date', 'created', 'timestamp', 'date_contacted', 'lead_date', 'contact_date']
+        # Skip important columns even if they have many empty values
+        is_important = np.array([bool(IMPORTANT_COLUMN_RE.search(str(col).lower().strip())) for col in cleaned_df.columns], dtype=bool)
+        for col in cleaned_df.columns[is_important & ~is_empty]:
+            logger.info(f"Preserving important column: {col}")
         
-        for col in cleaned_df.columns:
-            col_str = str(col).lower().strip()
-            
-            # Skip important columns even if they have many empty values
-            if any(important in col_str for important in important_columns):
-                logger.info(f"Preserving important column: {col}")
-                continue
-                
-            # Check if column has only None, NaN, or empty string values
-            empty_count = cleaned_df[col].isna().sum() + (cleaned_df[col] == '').sum() + (cleaned_df[col] == 'None').sum()
-            if empty_count >= len(cleaned_df) * 0.95:  # 95% or more empty
-                meaningless_columns.append(col)
+        # Count None, NaN, empty string and 'None' values per column in one reduction
+        empty_count = (missing | empty_string | cleaned_df.isin(['None'])).sum().to_numpy()
+        is_meaningless = ~is_empty & ~is_important & (empty_count >= len(cleaned_df) * 0.95)  # 95% or more empty
+        meaningless_columns = cleaned_df.columns[is_meaningless].tolist()
         
         if meaningless_columns:
             logger.info(f"Removing {len(meaningless_columns)} columns with no meaningful data: {meaningless_columns}")
-            cleaned_df = cleaned_df.drop(columns=meaningless_columns)
+        
+        cleaned_df = cleaned_df.loc[:, ~(is_empty | is_meaningless)]
         
         # Step 3: Remove Unnamed columns (pandas artifacts)
         logger.info("Step 3: Removing Unnamed columns...")
@@ -185,38 +391,15 @@ class LeadsDataCleaner:
             cleaned_df = cleaned_df.drop(columns=unnamed_columns)
         
         # Step 4: Remove special characters and standardize
-        cleaned_df.columns = cleaned_df.columns.str.strip()
-        cleaned_df.columns = cleaned_df.columns.str.replace('\n', ' ')
-        cleaned_df.columns = cleaned_df.columns.str.replace('\r', ' ')
-        cleaned_df.columns = cleaned_df.columns.str.replace('\t', ' ')
-        
-        # Convert to lowercase and replace spaces with underscores
-        cleaned_df.columns = cleaned_df.columns.str.lower().str.replace(' ', '_')
-        
-        # Remove any remaining special characters
-        cleaned_df.columns = cleaned_df.columns.str.replace('[^a-zA-Z0-9_]', '', regex=True)
+        # Lowercase, turn spaces, newlines and tabs into underscores and drop any remaining
+        # special characters, in one pass over the headers
+        cleaned_df.columns = [
+            COLUMN_SPECIAL_RE.sub('', COLUMN_SEPARATOR_RE.sub('_', col.strip().lower())) if isinstance(col, str) else col
+            for col in cleaned_df.columns
+        ]
         
         # Handle duplicate column names by adding suffixes
-        seen = {}
-        new_columns = []
-        for col in cleaned_df.columns:
-            if col in seen:
-                seen[col] += 1
-                new_columns.append(f"{col}_{seen[col]}")
-            else:
-                seen[col] = 0
-                new_columns.append(col)
-        cleaned_df.columns = new_columns
-        
-        # If we still have duplicate column names (which can happen with DataFrames), 
-        # ensure uniqueness by adding more specific suffixes
-        final_columns = []
-        for i, col in enumerate(cleaned_df.columns):
-            if col in final_columns:
-                final_columns.append(f"{col}_col_{i}")
-            else:
-                final_columns.append(col)
-        cleaned_df.columns = final_columns
+        cleaned_df.columns = deduplicate_names(cleaned_df.columns)
         
         # Standardize common column names
         column_mapping = {
@@ -289,16 +472,7 @@ class LeadsDataCleaner:
         if duplicate_cols:
             logger.warning(f"Found duplicate column names after mapping: {duplicate_cols}")
             # Rename duplicates to ensure uniqueness
-            seen = {}
-            new_columns = []
-            for col in cleaned_df.columns:
-                if col in seen:
-                    seen[col] += 1
-                    new_columns.append(f"{col}_dup_{seen[col]}")
-                else:
-                    seen[col] = 0
-                    new_columns.append(col)
-            cleaned_df.columns = new_columns
+            cleaned_df.columns = deduplicate_names(cleaned_df.columns, separator='_dup_')
             logger.info("Renamed duplicate columns to ensure uniqueness")
         
         # Final cleanup - remove any remaining problematic columns
@@ -329,32 +503,31 @@ class LeadsDataCleaner:
         if 'phone_number' not in df.columns:
             return df
             
-        cleaned_df = df.copy()
-        
-        def clean_phone(phone):
-            # Handle pandas Series vs scalar
-            if isinstance(phone, pd.Series):
-                return phone
-            
-            if pd.isna(phone):
-                return phone
-            
-            phone_str = str(phone)
-            
-            # Remove all non-digit characters
-            digits_only = re.sub(r'[^\d]', '', phone_str)
-            
-            # Handle different phone number formats
-            if len(digits_only) == 10:
-                return f"({digits_only[:3]}) {digits_only[3:6]}-{digits_only[6:]}"
-            elif len(digits_only) == 11 and digits_only[0] == '1':
-                return f"({digits_only[1:4]}) {digits_only[4:7]}-{digits_only[7:]}"
-            elif len(digits_only) > 0:
-                return digits_only
-            else:
-                return None
-        
-        cleaned_df['phone_number'] = cleaned_df['phone_number'].apply(clean_phone)
+        cleaned_df = df.copy(deep=False)
+        
+        phones = cleaned_df['phone_number']
+        if isinstance(phones, pd.DataFrame):
+            # Duplicate phone columns are left as they are
+            return cleaned_df
+        
+        # Vectorized over the non-missing values; missing numbers stay missing
+        present = phones.notna()
+        digits = as_text(phones[present]).str.replace(NON_DIGIT_PATTERN, '', regex=True)
+        lengths = digits.str.len()
+        
+        # 10 digits, or 11 with a leading country code 1, are formatted as (XXX) XXX-XXXX
+        has_country_code = (lengths == 11) & digits.str.startswith('1')
+        local = digits.where(~has_country_code, digits.str[1:])
+        formatted = '(' + local.str[:3] + ') ' + local.str[3:6] + '-' + local.str[6:]
+        
+        cleaned = np.select(
+            [((lengths == 10) | has_country_code).to_numpy(dtype=bool), (lengths > 0).to_numpy(dtype=bool)],
+            [formatted.to_numpy(dtype=object), digits.to_numpy(dtype=object)],
+            default=None
+        )
+        phones = phones.astype(object)
+        phones[present] = cleaned
+        cleaned_df['phone_number'] = phones
         self.cleaning_log.append("Phone numbers cleaned and standardized")
         
         return cleaned_df
@@ -366,27 +539,20 @@ class LeadsDataCleaner:
         if 'email' not in df.columns:
             return df
             
-        cleaned_df = df.copy()
-        
-        def clean_email(email):
-            # Handle pandas Series vs scalar
-            if isinstance(email, pd.Series):
-                return email
-            
-            if pd.isna(email):
-                return email
-            
-            email_str = str(email).strip().lower()
-            
-            # Basic email validation
-            email_pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-            
-            if re.match(email_pattern, email_str):
-                return email_str
-            else:
-                return None
-        
-        cleaned_df['email'] = cleaned_df['email'].apply(clean_email)
+        cleaned_df = df.copy(deep=False)
+        
+        emails = cleaned_df['email']
+        if isinstance(emails, pd.DataFrame):
+            # Duplicate email columns are left as they are
+            return cleaned_df
+        
+        # Vectorized over the non-missing values; invalid addresses become None
+        present = emails.notna()
+        normalized = as_text(emails[present]).str.strip().str.lower()
+        valid = normalized.str.match(EMAIL_PATTERN).to_numpy(dtype=bool)
+        emails = emails.astype(object)
+        emails[present] = np.where(valid, normalized.to_numpy(dtype=object), None)
+        cleaned_df['email'] = emails
         self.cleaning_log.append("Email addresses cleaned and validated")
         
         return cleaned_df
@@ -398,34 +564,31 @@ class LeadsDataCleaner:
         if 'full_name' not in df.columns:
             return df
             
-        cleaned_df = df.copy()
-        
-        def clean_name(name):
-            # Handle pandas Series vs scalar
-            if isinstance(name, pd.Series):
-                return name
-            
-            if pd.isna(name):
-                return name
-            
-            name_str = str(name).strip()
+        cleaned_df = df.copy(deep=False)
+        
+        names = cleaned_df['full_name']
+        if isinstance(names, pd.DataFrame):
+            # Duplicate name columns are left as they are
+            return cleaned_df
+        
+        # Vectorized over the non-missing values: collapse spaces, trim and title-case
+        present = names.notna()
+        normalized = as_text(names[present]).str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip().str.title()
+        names = names.astype(object)
+        names[present] = normalized.to_numpy(dtype=object)
+        cleaned_df['full_name'] = names
+        
+        # Split full name into first and last name if not already present (one split for both)
+        if 'first_name' not in cleaned_df.columns or 'last_name' not in cleaned_df.columns:
+            parts = normalized.str.split(n=1, expand=True).reindex(columns=[0, 1])
             
-            # Remove extra spaces and standardize
-            name_str = re.sub(r'\s+', ' ', name_str)
-            name_str = name_str.title()
+            if 'first_name' not in cleaned_df.columns:
+                cleaned_df['first_name'] = pd.Series(None, index=cleaned_df.index, dtype=object)
+                cleaned_df.loc[present, 'first_name'] = parts[0].to_numpy(dtype=object)
             
-            return name_str
-        
-        cleaned_df['full_name'] = cleaned_df['full_name'].apply(clean_name)
-        
-        # Split full name into first and last name if not already present
-        if 'first_name' not in cleaned_df.columns:
-            # Use vectorized operations instead of apply
-            cleaned_df['first_name'] = cleaned_df['full_name'].astype(str).str.split().str[0]
-        
-        if 'last_name' not in cleaned_df.columns:
-            # Use vectorized operations instead of apply
-            cleaned_df['last_name'] = cleaned_df['full_name'].astype(str).str.split().str[1:].str.join(' ')
+            if 'last_name' not in cleaned_df.columns:
+                cleaned_df['last_name'] = pd.Series(None, index=cleaned_df.index, dtype=object)
+                cleaned_df.loc[present, 'last_name'] = parts[1].fillna('').to_numpy(dtype=object)
         
         self.cleaning_log.append("Names cleaned and standardized")
         return cleaned_df
@@ -436,13 +599,16 @@ class LeadsDataCleaner:
         """
         address_columns = ['address', 'city', 'state', 'country', 'postal_code']
         
-        cleaned_df = df.copy()
+        cleaned_df = df.copy(deep=False)
         
         for col in address_columns:
-            if col in cleaned_df.columns:
-                cleaned_df[col] = cleaned_df[col].apply(
-                    lambda x: str(x).strip().title() if pd.notna(x) else None
-                )
+            if col in cleaned_df.columns and not isinstance(cleaned_df[col], pd.DataFrame):
+                # Vectorized trim and title-case of the non-missing values; missing become None
+                values = cleaned_df[col]
+                present = values.notna()
+                cleaned = pd.Series(None, index=values.index, dtype=object)
+                cleaned[present] = as_text(values[present]).str.strip().str.title().to_numpy(dtype=object)
+                cleaned_df[col] = cleaned
         
         self.cleaning_log.append("Addresses cleaned and standardized")
         return cleaned_df
@@ -452,7 +618,7 @@ class LeadsDataCleaner:
         Remove duplicate records across all sheets based on multiple criteria
         """
         logger.info("Starting duplicate removal process...")
-        cleaned_df = df.copy()
+        cleaned_df = df.copy(deep=False)
         initial_count = len(cleaned_df)
         logger.info(f"Initial count: {initial_count}")
         
@@ -474,41 +640,9 @@ class LeadsDataCleaner:
             cleaned_df['duplicate_key'] = cleaned_df['full_name'].fillna('')
             logger.info("Using full name as deduplication field (phone/email not available)")
         
-        # Create secondary keys for enhanced duplicate detection
-        if 'phone_number' in cleaned_df.columns and 'email' in cleaned_df.columns:
-            # Secondary key: email + phone combination for cross-validation
-            cleaned_df['secondary_key'] = cleaned_df['email'].fillna('') + '|' + cleaned_df['phone_number'].fillna('')
-        elif 'phone_number' in cleaned_df.columns and 'full_name' in cleaned_df.columns:
-            # Secondary key: phone + name combination
-            cleaned_df['secondary_key'] = cleaned_df['phone_number'].fillna('') + '|' + cleaned_df['full_name'].fillna('')
-        elif 'email' in cleaned_df.columns and 'full_name' in cleaned_df.columns:
-            # Secondary key: email + name combination
-            cleaned_df['secondary_key'] = cleaned_df['email'].fillna('') + '|' + cleaned_df['full_name'].fillna('')
-        
         # Remove duplicates, keeping the record with most complete information
         # Prioritize phone numbers and emails heavily in scoring
-        def get_completeness_score(row):
-            score = 0
-            
-            # Phone number gets highest weight (40 points)
-            if 'phone_number' in row.index and pd.notna(row['phone_number']) and str(row['phone_number']).strip() != '':
-                score += 40
-            
-            # Email gets second highest weight (35 points)
-            if 'email' in row.index and pd.notna(row['email']) and str(row['email']).strip() != '':
-                score += 35
-            
-            # Other fields get lower weights
-            if 'city' in row.index and pd.notna(row['city']) and str(row['city']).strip() != '':
-                score += 15
-            
-            if 'full_name' in row.index and pd.notna(row['full_name']) and str(row['full_name']).strip() != '':
-                score += 10
-            
-            return score
-        
-        # Sort by completeness score (descending) and source sheet priority
-        cleaned_df['completeness_score'] = cleaned_df.apply(get_completeness_score, axis=1)
+        cleaned_df['completeness_score'] = weighted_field_score(cleaned_df, COMPLETENESS_WEIGHTS)
         
         # Prioritize certain sheets (you can customize this order)
         sheet_priority = {
@@ -524,28 +658,27 @@ class LeadsDataCleaner:
                     return priority
             return 999  # Default low priority
         
-        # Add sheet priority column
+        # Sheet priority per row, looked up once per distinct sheet name
         if 'source_sheet' in cleaned_df.columns:
-            cleaned_df['sheet_priority'] = cleaned_df['source_sheet'].apply(get_sheet_priority)
-            
-            # Sort by completeness score (descending) and sheet priority (ascending)
-            cleaned_df = cleaned_df.sort_values(['completeness_score', 'sheet_priority'], ascending=[False, True])
+            sheet_codes, sheet_names = pd.factorize(cleaned_df['source_sheet'])
+            # Missing sheet names get code -1, which picks the trailing default priority
+            sheet_priorities = np.array([get_sheet_priority(name) for name in sheet_names] + [999], dtype=np.int32)
+            row_sheet_priority = sheet_priorities[sheet_codes]
         else:
-            # If no source sheet, just sort by completeness score
-            cleaned_df = cleaned_df.sort_values(['completeness_score'], ascending=[False])
+            row_sheet_priority = np.zeros(len(cleaned_df), dtype=np.int32)
         
-        # Remove duplicates based on duplicate key
+        # Keep the most complete record per duplicate key, preferring higher-priority sheets on
+        # ties. Scores are multiples of 5 and sheet priorities are below 1000, so one composite
+        # key orders by score first; a single hashed groupby pass replaces a full sort
         logger.info("Removing duplicates based on duplicate key...")
-        cleaned_df = cleaned_df.drop_duplicates(subset=['duplicate_key'], keep='first')
+        rank = cleaned_df['completeness_score'].to_numpy(dtype=np.int32) * 1000 - row_sheet_priority
+        key_codes, _ = pd.factorize(cleaned_df['duplicate_key'])
+        keep_positions = pd.Series(rank).groupby(key_codes, sort=False).idxmax().to_numpy()
+        cleaned_df = cleaned_df.iloc[keep_positions]
         
         # Clean up temporary columns
         logger.info("Cleaning up temporary columns...")
-        if 'duplicate_key' in cleaned_df.columns:
-            cleaned_df = cleaned_df.drop(['duplicate_key'], axis=1)
-        if 'completeness_score' in cleaned_df.columns:
-            cleaned_df = cleaned_df.drop(['completeness_score'], axis=1)
-        if 'sheet_priority' in cleaned_df.columns:
-            cleaned_df = cleaned_df.drop(['sheet_priority'], axis=1)
+        cleaned_df = cleaned_df.drop(columns=['duplicate_key', 'completeness_score'])
         
         removed_count = initial_count - len(cleaned_df)
         if removed_count > 0:
@@ -557,61 +690,58 @@ class LeadsDataCleaner:
         """
         Add metadata columns for CRM tracking
         """
-        cleaned_df = df.copy()
+        cleaned_df = df.copy(deep=False)
         
-        # Add creation timestamp
-        cleaned_df['cleaned_date'] = datetime.now()
+        # Add creation timestamp (one scalar broadcast into a datetime64 column)
+        now = pd.Timestamp.now()
+        cleaned_df['cleaned_date'] = now
         
         # Add lead status
         cleaned_df['lead_status'] = 'New Lead'
         
         # Add tracking columns for follow-ups
-        cleaned_df['status_updated_date'] = datetime.now()
-        cleaned_df['last_contact_date'] = None
-        cleaned_df['follow_up_date'] = None
-        cleaned_df['follow_up_count'] = 0
-        
-        # Add lead score (prioritizing phone and email heavily)
-        def calculate_lead_score(row):
-            score = 0
-            
-            # Phone number gets highest weight (40 points) - most important for sales
-            if pd.notna(row.get('phone_number', None)) and str(row.get('phone_number', '')).strip() != '':
-                score += 40
-            
-            # Email gets second highest weight (35 points) - second most important
-            if pd.notna(row.get('email', None)) and str(row.get('email', '')).strip() != '':
-                score += 35
-            
-            # Other fields get lower weights
-            if pd.notna(row.get('city', None)) and str(row.get('city', '')).strip() != '':
-                score += 15
-            
-            if pd.notna(row.get('child_age', None)) or pd.notna(row.get('lead_type', None)):
-                score += 10
-            
-            return score
-        
-        cleaned_df['lead_score'] = cleaned_df.apply(calculate_lead_score, axis=1)
-        
-        # Add priority based on score (adjusted for new scoring system)
-        def assign_priority(score):
-            if score >= 70:  # Phone + Email = 75 points
-                return 'High'
-            elif score >= 40:  # Phone only = 40 points
-                return 'Medium'
-            else:
-                return 'Low'
+        cleaned_df['status_updated_date'] = now
+        cleaned_df['last_contact_date'] = pd.NaT
+        cleaned_df['follow_up_date'] = pd.NaT
+        cleaned_df['follow_up_count'] = np.int8(0)
+        
+        # Add lead score (prioritizing phone and email heavily), computed per column
+        lead_score = weighted_field_score(cleaned_df, LEAD_SCORE_WEIGHTS)
+        has_profile = np.zeros(len(cleaned_df), dtype=bool)
+        for col in ['child_age', 'lead_type']:
+            if col in cleaned_df.columns:
+                has_profile |= cleaned_df[col].notna().to_numpy(dtype=bool)
+        cleaned_df['lead_score'] = lead_score + has_profile * np.int16(10)
         
-        cleaned_df['priority'] = cleaned_df['lead_score'].apply(assign_priority)
+        # Add priority based on score: phone + email (75) is High, phone alone (40) Medium
+        cleaned_df['priority'] = np.select(
+            [cleaned_df['lead_score'] >= 70, cleaned_df['lead_score'] >= 40],
+            ['High', 'Medium'],
+            default='Low'
+        )
         
         self.cleaning_log.append("Added metadata columns for CRM tracking")
         return cleaned_df
     
+    def get_openai_client(self):
+        """
+        OpenAI client shared by all enrichment calls (and threads) of this cleaner, so its
+        HTTP connection pool is reused
+        """
+        if self.openai_client is None:
+            from openai import OpenAI
+            self.openai_client = OpenAI(
+                api_key=self.openai_api_key,
+                max_retries=AI_MAX_RETRIES,
+                timeout=AI_REQUEST_TIMEOUT_SECONDS
+            )
+        return self.openai_client
+    
     def setup_openai(self, api_key: Optional[str] = None):
         """
         Setup OpenAI API for AI-powered data enrichment
         """
+        self.openai_client = None
         if api_key:
             self.openai_api_key = api_key
         else:
@@ -627,11 +757,10 @@ class LeadsDataCleaner:
         
         try:
             # Test the API connection using new OpenAI API format
-            from openai import OpenAI
-            client = OpenAI(api_key=self.openai_api_key)
+            client = self.get_openai_client()
             
             response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=AI_MODEL,
                 messages=[{"role": "user", "content": "Hello"}],
                 max_tokens=5
             )
@@ -641,99 +770,246 @@ class LeadsDataCleaner:
             logger.error(f"OpenAI API connection failed: {str(e)}")
             return False
     
+    def _enrichment_prompt(self, lead_data: Dict[str, Any]) -> str:
+        """Per-lead part of the enrichment request (the instructions are AI_SYSTEM_PROMPT)"""
+        fields = [
+            ('Name', 'full_name'), ('Email', 'email'), ('Phone', 'phone_number'), ('City', 'city'),
+            ('Child age', 'child_age'), ('Lead type', 'lead_type'), ('Source', 'source_sheet')
+        ]
+        return '\n'.join(f"- {label}: {lead_data.get(key, 'N/A')}" for label, key in fields)
+    
+    def _apply_ai_insights(self, lead_data: Dict[str, Any], ai_content: str) -> Dict[str, Any]:
+        """Parse the model's JSON answer into the lead's ai_* fields"""
+        try:
+            ai_insights = json_loads(ai_content)
+            
+            # Add AI insights to lead data
+            lead_data['ai_customer_segment'] = ai_insights.get('customer_segment', 'Unknown')
+            lead_data['ai_potential_value'] = ai_insights.get('potential_value', 'Medium')
+            lead_data['ai_engagement_strategy'] = ai_insights.get('engagement_strategy', 'Standard')
+            lead_data['ai_library_benefits'] = '; '.join(ai_insights.get('library_benefits', []))
+            
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            logger.warning("Failed to parse AI response")
+        
+        return lead_data
+    
+    def _cached_ai_answers(self, prompts: List[str]) -> Dict[str, str]:
+        """Previously stored answers for any of the prompts, by prompt"""
+        keys = {ai_cache_key(prompt): prompt for prompt in prompts}
+        missing = [key for key in keys if key not in AI_ANSWER_CACHE]
+        if missing and self.db_manager is not None:
+            AI_ANSWER_CACHE.update(self.db_manager.get_ai_answers(missing))
+        return {prompt: AI_ANSWER_CACHE[key] for key, prompt in keys.items() if key in AI_ANSWER_CACHE}
+    
+    def _store_ai_answers(self, answers: Dict[str, Optional[str]]):
+        """Remember fresh answers (by prompt) in memory and, when available, the database"""
+        entries = {ai_cache_key(prompt): answer for prompt, answer in answers.items() if answer is not None}
+        if not entries:
+            return
+        AI_ANSWER_CACHE.update(entries)
+        if self.db_manager is not None:
+            self.db_manager.save_ai_answers(entries)
+    
     def enrich_lead_with_ai(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
         """
         Use AI to enrich lead data with additional insights
         """
-        if not hasattr(self, 'openai_api_key') or not self.openai_api_key:
+        if not self.openai_api_key:
             logger.warning("OpenAI API not configured. Skipping AI enrichment.")
             return lead_data
         
         try:
-            # Prepare lead information for AI analysis
-            lead_info = f"""
-            Lead Information:
-            Name: {lead_data.get('full_name', 'N/A')}
-            Email: {lead_data.get('email', 'N/A')}
-            Phone: {lead_data.get('phone_number', 'N/A')}
-            City: {lead_data.get('city', 'N/A')}
-            Child Age: {lead_data.get('child_age', 'N/A')}
-            Lead Type: {lead_data.get('lead_type', 'N/A')}
-            Source Sheet: {lead_data.get('source_sheet', 'N/A')}
-            """
-            
-            prompt = f"""
-            Analyze this individual lead data for a library business and provide:
-            1. Customer segment (parent, student, professional, senior, family, individual, etc.)
-            2. Potential value (Low/Medium/High based on usage patterns and family size)
-            3. Recommended engagement strategy
-            4. Key library benefits to highlight for this customer type
-            
-            {lead_info}
+            prompt = self._enrichment_prompt(lead_data)
             
-            Respond in JSON format:
-            {{
-                "customer_segment": "string",
-                "potential_value": "Low/Medium/High",
-                "engagement_strategy": "string",
-                "library_benefits": ["benefit1", "benefit2", "benefit3"]
-            }}
-            """
+            cached = self._cached_ai_answers([prompt])
+            if prompt in cached:
+                return self._apply_ai_insights(lead_data, cached[prompt])
             
             # Use new OpenAI API format
-            from openai import OpenAI
-            client = OpenAI(api_key=self.openai_api_key)
+            client = self.get_openai_client()
             
             response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=300,
-                temperature=0.3
+                messages=enrichment_messages(prompt),
+                **AI_ENRICHMENT_PARAMS
             )
+            ai_content = response.choices[0].message.content
+            self._store_ai_answers({prompt: ai_content})
             
             # Parse AI response
-            ai_content = response.choices[0].message.content
-            try:
-                import json
-                ai_insights = json.loads(ai_content)
-                
-                # Add AI insights to lead data
-                lead_data['ai_customer_segment'] = ai_insights.get('customer_segment', 'Unknown')
-                lead_data['ai_potential_value'] = ai_insights.get('potential_value', 'Medium')
-                lead_data['ai_engagement_strategy'] = ai_insights.get('engagement_strategy', 'Standard')
-                lead_data['ai_library_benefits'] = '; '.join(ai_insights.get('library_benefits', []))
-                
-                logger.info(f"AI enrichment completed for {lead_data.get('full_name', 'Unknown')}")
-                
-            except json.JSONDecodeError:
-                logger.warning("Failed to parse AI response")
+            lead_data = self._apply_ai_insights(lead_data, ai_content)
+            logger.info(f"AI enrichment completed for {lead_data.get('full_name', 'Unknown')}")
                 
         except Exception as e:
             logger.error(f"AI enrichment failed: {str(e)}")
         
         return lead_data
     
-    def enrich_all_leads_with_ai(self, df: pd.DataFrame) -> pd.DataFrame:
+    async def _enrich_leads_async(self, leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Request insights for all leads concurrently (at most AI_MAX_CONCURRENT_REQUESTS in
+        flight). Leads that produce the same prompt share a single request, and prompts
+        answered before are served from the cache.
+        """
+        from openai import AsyncOpenAI
+        
+        semaphore = asyncio.Semaphore(AI_MAX_CONCURRENT_REQUESTS)
+        prompts = [self._enrichment_prompt(lead) for lead in leads]
+        answer_by_prompt = self._cached_ai_answers(list(dict.fromkeys(prompts)))
+        pending_prompts = [prompt for prompt in dict.fromkeys(prompts) if prompt not in answer_by_prompt]
+        completed = 0
+        
+        async def request_insights(client, prompt):
+            nonlocal completed
+            async with semaphore:
+                try:
+                    response = await client.chat.completions.create(
+                        messages=enrichment_messages(prompt),
+                        **AI_ENRICHMENT_PARAMS
+                    )
+                    return response.choices[0].message.content
+                except Exception as e:
+                    logger.error(f"AI enrichment failed: {str(e)}")
+                    return None
+                finally:
+                    completed += 1
+                    if completed % 5 == 0:
+                        logger.info(f"AI Progress: {completed / len(pending_prompts) * 100:.1f}% - Processed {completed}/{len(pending_prompts)} requests")
+        
+        if pending_prompts:
+            async with AsyncOpenAI(
+                api_key=self.openai_api_key,
+                max_retries=AI_MAX_RETRIES,
+                timeout=AI_REQUEST_TIMEOUT_SECONDS
+            ) as client:
+                answers = await asyncio.gather(*(request_insights(client, prompt) for prompt in pending_prompts))
+            fresh_answers = dict(zip(pending_prompts, answers))
+            self._store_ai_answers(fresh_answers)
+            answer_by_prompt.update(fresh_answers)
+        
+        if len(pending_prompts) < len(leads):
+            logger.info(f"Reused AI answers for {len(leads) - len(pending_prompts)} leads with identical or cached details")
+        
+        return [
+            self._apply_ai_insights(lead, answer_by_prompt[prompt]) if answer_by_prompt.get(prompt) is not None else lead
+            for lead, prompt in zip(leads, prompts)
+        ]
+    
+    def _enrich_leads_batch_api(self, leads: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """
+        Enrich leads through a single OpenAI Batch API job (half the cost of direct requests).
+        Returns None if the job fails or doesn't finish within AI_BATCH_TIMEOUT_SECONDS.
+        """
+        prompts = [self._enrichment_prompt(lead) for lead in leads]
+        answer_by_prompt = self._cached_ai_answers(list(dict.fromkeys(prompts)))
+        unique_prompts = [prompt for prompt in dict.fromkeys(prompts) if prompt not in answer_by_prompt]
+        if not unique_prompts:
+            logger.info("All AI answers served from the cache")
+            return [self._apply_ai_insights(lead, answer_by_prompt[prompt]) for lead, prompt in zip(leads, prompts)]
+        
+        client = self.get_openai_client()
+        
+        # One request per distinct uncached prompt; custom_id is the prompt's position
+        requests_jsonl = b'\n'.join(
+            json_dumps_bytes({
+                'custom_id': str(i),
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': {
+                    'messages': enrichment_messages(prompt),
+                    **AI_ENRICHMENT_PARAMS
+                }
+            })
+            for i, prompt in enumerate(unique_prompts)
+        )
+        
+        batch = None
+        try:
+            input_file = client.files.create(
+                file=('lead_enrichment.jsonl', requests_jsonl),
+                purpose='batch'
+            )
+            batch = client.batches.create(
+                input_file_id=input_file.id,
+                endpoint='/v1/chat/completions',
+                completion_window='24h'
+            )
+            logger.info(f"Submitted AI batch {batch.id} with {len(unique_prompts)} requests")
+            
+            deadline = time.monotonic() + AI_BATCH_TIMEOUT_SECONDS
+            while batch.status not in ('completed', 'failed', 'expired', 'cancelled'):
+                if time.monotonic() > deadline:
+                    logger.warning(f"AI batch {batch.id} did not finish in time, cancelling")
+                    client.batches.cancel(batch.id)
+                    return None
+                time.sleep(AI_BATCH_POLL_SECONDS)
+                batch = client.batches.retrieve(batch.id)
+            
+            if batch.status != 'completed' or not batch.output_file_id:
+                logger.error(f"AI batch {batch.id} ended with status {batch.status}")
+                return None
+            
+            answers = {}
+            for line in client.files.content(batch.output_file_id).content.splitlines():
+                if not line.strip():
+                    continue
+                result = json_loads(line)
+                response = result.get('response') or {}
+                if response.get('status_code') == 200:
+                    answers[int(result['custom_id'])] = response['body']['choices'][0]['message']['content']
+            
+        except Exception as e:
+            logger.error(f"AI batch enrichment failed: {str(e)}")
+            if batch is not None and batch.status in ('validating', 'in_progress', 'finalizing'):
+                try:
+                    client.batches.cancel(batch.id)
+                except Exception:
+                    pass
+            return None
+        
+        logger.info(f"AI batch {batch.id} returned {len(answers)}/{len(unique_prompts)} answers")
+        fresh_answers = {prompt: answers.get(i) for i, prompt in enumerate(unique_prompts)}
+        self._store_ai_answers(fresh_answers)
+        answer_by_prompt.update(fresh_answers)
+        return [
+            self._apply_ai_insights(lead, answer_by_prompt[prompt]) if answer_by_prompt.get(prompt) is not None else lead
+            for lead, prompt in zip(leads, prompts)
+        ]
+    
+    def enrich_lead_batch(self, leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Enrich many leads with concurrent API requests; from inside a running event loop the
+        blocking per-lead calls are spread over a thread pool instead
+        """
+        if not self.openai_api_key:
+            logger.warning("OpenAI API not configured. Skipping AI enrichment.")
+            return leads
+        
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._enrich_leads_async(leads))
+        
+        logger.warning("Event loop already running, enriching leads on worker threads")
+        with ThreadPoolExecutor(max_workers=AI_MAX_CONCURRENT_REQUESTS) as executor:
+            return list(executor.map(self.enrich_lead_with_ai, leads))
+    
+    def enrich_all_leads_with_ai(self, df: pd.DataFrame, use_batch_api: bool = False) -> pd.DataFrame:
         """
-        Enrich all leads with AI insights
+        Enrich all leads with AI insights. With use_batch_api the requests are submitted as
+        one OpenAI Batch API job, falling back to direct concurrent requests if it fails.
         """
-        if not hasattr(self, 'openai_api_key') or not self.openai_api_key:
+        if not self.openai_api_key:
             logger.warning("OpenAI API not configured. Skipping AI enrichment.")
             return df
         
         logger.info("Starting AI enrichment for all leads...")
         total_leads = len(df)
         
-        enriched_data = []
-        for idx, row in df.iterrows():
-            lead_dict = row.to_dict()
-            enriched_lead = self.enrich_lead_with_ai(lead_dict)
-            enriched_data.append(enriched_lead)
-            
-            # Progress update every 5 leads for better visibility
-            if (idx + 1) % 5 == 0:
-                progress = ((idx + 1) / total_leads) * 100
-                logger.info(f"AI Progress: {progress:.1f}% - Processed {idx + 1}/{total_leads} leads")
+        leads = df.to_dict('records')
+        enriched_data = self._enrich_leads_batch_api(leads) if use_batch_api else None
+        if enriched_data is None:
+            enriched_data = self.enrich_lead_batch(leads)
         
         enriched_df = pd.DataFrame(enriched_data)
         self.cleaning_log.append("AI enrichment completed for all leads")
@@ -741,7 +1017,7 @@ class LeadsDataCleaner:
         
         return enriched_df
     
-    def clean_all_data(self, file_path, enable_ai_enrichment: bool = False):
+    def clean_all_data(self, file_path, enable_ai_enrichment: bool = False, use_batch_api: bool = False):
         """
         Complete data cleaning pipeline with optional AI enrichment
         """
@@ -774,13 +1050,38 @@ class LeadsDataCleaner:
         # AI enrichment if enabled
         if enable_ai_enrichment:
             logger.info("Starting AI enrichment...")
-            df = self.enrich_all_leads_with_ai(df)
+            df = self.enrich_all_leads_with_ai(df, use_batch_api=use_batch_api)
+        
+        df = self.optimize_dtypes(df)
         
         self.cleaned_data = df
         logger.info("Data cleaning completed successfully!")
         
         return df
     
+    def optimize_dtypes(self, df):
+        """
+        Downcast score/count columns and store low-cardinality text columns as categoricals
+        to cut memory and speed up later sorting, grouping and de-duplication
+        """
+        optimized_df = df.copy(deep=False)
+        
+        if 'lead_score' in optimized_df.columns:
+            optimized_df['lead_score'] = pd.to_numeric(optimized_df['lead_score'], downcast='integer')
+        if 'follow_up_count' in optimized_df.columns:
+            optimized_df['follow_up_count'] = optimized_df['follow_up_count'].astype('int8')
+        
+        # Status and priority get the same category order as in the dashboard
+        optimized_df = categorize_known_columns(optimized_df)
+        
+        for col in CATEGORY_CANDIDATES:
+            if col in optimized_df.columns and not isinstance(optimized_df[col], pd.DataFrame) and len(optimized_df):
+                if optimized_df[col].nunique() / len(optimized_df) < CATEGORY_MAX_UNIQUE_RATIO:
+                    optimized_df[col] = optimized_df[col].astype('category')
+        
+        self.cleaning_log.append("Column dtypes optimized")
+        return optimized_df
+    
     def get_cleaning_summary(self):
         """
         Get a summary of the cleaning process
@@ -806,9 +1107,10 @@ class LeadsDataCleaner:
             raise ValueError("No cleaned data available. Run clean_all_data() first.")
         
         if format.lower() == 'excel':
-            self.cleaned_data.to_excel(output_path, index=False)
+            # Streamed through xlsxwriter's constant_memory mode (openpyxl write-only fallback)
+            write_excel(self.cleaned_data, output_path)
         elif format.lower() == 'csv':
-            self.cleaned_data.to_csv(output_path, index=False)
+            self.cleaned_data.to_csv(output_path, index=False, chunksize=CSV_WRITE_CHUNK_ROWS)
         else:
             raise ValueError("Unsupported format. Use 'excel' or 'csv'.")
         
@@ -1,24 +1,116 @@
 import sqlite3
 import pandas as pd
 import json
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any, Tuple
 import streamlit as st
+from export_utils import EXPORT_EXTENSIONS, MAX_EXPORT_ROWS, cached_export, export_bytes, export_page, export_page_count
 
 logger = logging.getLogger(__name__)
 
+# Connection tuning: WAL lets readers run alongside the writer and only fsyncs at
+# checkpoints, with a 64 MB page cache, in-memory temp tables and 256 MB of mmap I/O
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; "
+    "PRAGMA cache_size=-65536; PRAGMA temp_store=MEMORY; PRAGMA mmap_size=268435456;"
+)
+
+# Lead columns written by save_leads_data, in SQL parameter order, with the value used
+# when the DataFrame doesn't have the column
+LEAD_SAVE_COLUMNS = [
+    ('full_name', None),
+    ('phone_number', None),
+    ('email', None),
+    ('city', None),
+    ('lead_status', 'New Lead'),
+    ('priority', 'Medium'),
+    ('lead_score', 0.0),
+    ('assigned_to', None),
+    ('source_sheet', None),
+    ('lead_date', None),
+    ('notes', None)
+]
+
+# Lead columns returned by load_leads_data (user_id is implied by the query), and the
+# ones pandas parses into datetimes while reading
+LEAD_LOAD_COLUMNS = [
+    'id', 'full_name', 'phone_number', 'email', 'city', 'lead_status', 'priority',
+    'lead_score', 'assigned_to', 'source_sheet', 'lead_date', 'status_updated_date',
+    'last_contact_date', 'follow_up_date', 'follow_up_count', 'notes', 'created_at', 'updated_at'
+]
+LEAD_TIMESTAMP_COLUMNS = ['created_at', 'updated_at', 'status_updated_date', 'last_contact_date', 'follow_up_date']
+
+# Lead columns mirrored into the leads_fts full-text index used by search_leads
+FTS_COLUMNS = ['full_name', 'phone_number', 'email', 'city']
+
+# The trigram tokenizer matches any substring of at least this many characters, like
+# the LIKE '%term%' scan it replaces; shorter terms still use LIKE
+FTS_MIN_TERM_CHARS = 3
+
+_fts_columns = ', '.join(FTS_COLUMNS)
+_fts_new = ', '.join(f"new.{col}" for col in FTS_COLUMNS)
+_fts_old = ', '.join(f"old.{col}" for col in FTS_COLUMNS)
+
+# External-content FTS5 table over leads, kept in sync by triggers (updates only touch
+# the index when a searchable column changes)
+LEADS_FTS_SCHEMA = f"""
+    CREATE VIRTUAL TABLE leads_fts USING fts5(
+        {_fts_columns}, content='leads', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TRIGGER leads_fts_insert AFTER INSERT ON leads BEGIN
+        INSERT INTO leads_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new});
+    END;
+    CREATE TRIGGER leads_fts_delete AFTER DELETE ON leads BEGIN
+        INSERT INTO leads_fts(leads_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_fts_old});
+    END;
+    CREATE TRIGGER leads_fts_update AFTER UPDATE OF {_fts_columns} ON leads BEGIN
+        INSERT INTO leads_fts(leads_fts, rowid, {_fts_columns}) VALUES ('delete', old.id, {_fts_old});
+        INSERT INTO leads_fts(rowid, {_fts_columns}) VALUES (new.id, {_fts_new});
+    END;
+    INSERT INTO leads_fts(leads_fts) VALUES ('rebuild');
+"""
+
+def lead_save_rows(leads_df: pd.DataFrame):
+    """Plain tuples of the LEAD_SAVE_COLUMNS values, one per lead, in leads_df order"""
+    values = leads_df.reindex(columns=[col for col, _ in LEAD_SAVE_COLUMNS])
+    missing = {col: default for col, default in LEAD_SAVE_COLUMNS if col not in leads_df.columns}
+    if missing:
+        values = values.assign(**missing)
+    # sqlite3 can't bind pd.NA (missing values in string/nullable columns) or NaT; store NULL
+    values = values.astype(object).where(values.notna(), None)
+    return values.itertuples(index=False, name=None)
+
 class DatabaseManager:
     """Manages database operations for CRM data persistence"""
     
     def __init__(self, db_path: str = "crm_database.db"):
         self.db_path = db_path
+        # One connection per manager, shared by every Streamlit session through init_managers
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.RLock()
+        # Set by init_database when the SQLite build supports FTS5 trigram indexes
+        self.fts_enabled = False
         self.init_database()
     
+    @contextmanager
+    def connection(self):
+        """Shared connection guarded by a lock; commits on success and rolls back on error"""
+        with self._lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+    
     def init_database(self):
         """Initialize database with required tables"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
+                conn.executescript(SQLITE_PRAGMAS)
                 cursor = conn.cursor()
                 
                 # Create leads table
@@ -86,6 +178,25 @@ class DatabaseManager:
                     )
                 ''')
                 
+                # Create AI answer cache table (keyed by a hash of model + prompt)
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS ai_cache (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                
+                # Indexes for the per-user lead queries (newest first) and audit log cleanup
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_leads_user ON leads(user_id, created_at DESC)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_leads_user_status ON leads(user_id, lead_status)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_ts ON audit_log(timestamp)")
+                
+                self.fts_enabled = self._init_leads_fts(conn)
+                
+                # Refresh planner statistics where they are missing or stale
+                cursor.execute("PRAGMA optimize")
+                
                 conn.commit()
                 logger.info("Database initialized successfully")
                 
@@ -93,113 +204,109 @@ class DatabaseManager:
             logger.error(f"Error initializing database: {str(e)}")
             raise
     
-    def save_leads_data(self, leads_df: pd.DataFrame, user_id: str) -> bool:
-        """Save leads data to database"""
+    def _insert_leads(self, cursor, user_id: str, rows: List[tuple]) -> List[int]:
+        """Insert lead rows in one executemany call and return their new ids in row order"""
+        # AUTOINCREMENT ids only grow, so everything above the current maximum is ours
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM leads")
+        previous_max_id = cursor.fetchone()[0]
+        cursor.executemany('''
+            INSERT INTO leads (
+                user_id, full_name, phone_number, email, city, 
+                lead_status, priority, lead_score, assigned_to, 
+                source_sheet, lead_date, notes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(user_id,) + row for row in rows])
+        cursor.execute(
+            "SELECT id FROM leads WHERE user_id = ? AND id > ? ORDER BY id",
+            (user_id, previous_max_id)
+        )
+        return [row[0] for row in cursor.fetchall()]
+    
+    def _update_leads(self, cursor, user_id: str, id_rows: List[tuple]):
+        """
+        Update leads from (id, row) pairs in one executemany call. Rows whose stored values
+        already match are skipped by the WHERE clause, so they cost no write.
+        """
+        columns = ', '.join(col for col, _ in LEAD_SAVE_COLUMNS)
+        placeholders = ', '.join('?' * len(LEAD_SAVE_COLUMNS))
+        cursor.executemany(f'''
+            UPDATE leads 
+            SET ({columns}) = ({placeholders}), updated_at = CURRENT_TIMESTAMP
+            WHERE id = ? AND user_id = ? AND ({columns}) IS NOT ({placeholders})
+        ''', [row + (lead_id, user_id) + row for lead_id, row in id_rows])
+    
+    def _match_existing_leads(self, cursor, user_id: str, leads_df: pd.DataFrame) -> List[Optional[int]]:
+        """
+        Id of the stored lead with the same (phone_number, email) for each row of leads_df,
+        or None. Repeated keys pair up in order; rows with neither field never match.
+        """
+        key_columns = ['phone_number', 'email']
+        cursor.execute("SELECT id, phone_number, email FROM leads WHERE user_id = ? ORDER BY id", (user_id,))
+        existing = pd.DataFrame(cursor.fetchall(), columns=['id'] + key_columns, dtype=object)
+        incoming = leads_df.reindex(columns=key_columns).astype(object)
+        incoming = incoming.where(incoming.notna(), None).reset_index(drop=True)
+        
+        for frame in (existing, incoming):
+            frame['occurrence'] = frame.groupby(key_columns, dropna=False, sort=False).cumcount()
+        existing = existing[existing[key_columns].notna().any(axis=1)]
+        
+        matched = incoming.merge(existing, on=key_columns + ['occurrence'], how='left')
+        matched.loc[incoming[key_columns].isna().all(axis=1).to_numpy(), 'id'] = None
+        return [int(lead_id) if pd.notna(lead_id) else None for lead_id in matched['id'].tolist()]
+    
+    def save_leads_data(self, leads_df: pd.DataFrame, user_id: str) -> Optional[List[int]]:
+        """
+        Save leads data to database. Returns the database id of every row in
+        leads_df order, or None if the save failed
+        """
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
+                rows = list(lead_save_rows(leads_df))
                 
                 # Check if we're updating existing leads or creating new ones
                 if 'id' in leads_df.columns and leads_df['id'].notna().any():
                     # Update existing leads
                     logger.info(f"Updating {len(leads_df)} existing leads for user {user_id}")
                     
-                    for _, row in leads_df.iterrows():
-                        if pd.notna(row.get('id')):
-                            # Update existing lead
-                            cursor.execute('''
-                                UPDATE leads 
-                                SET full_name = ?, phone_number = ?, email = ?, city = ?,
-                                    lead_status = ?, priority = ?, lead_score = ?, assigned_to = ?,
-                                    source_sheet = ?, lead_date = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
-                                WHERE id = ? AND user_id = ?
-                            ''', (
-                                row.get('full_name'),
-                                row.get('phone_number'),
-                                row.get('email'),
-                                row.get('city'),
-                                row.get('lead_status', 'New Lead'),
-                                row.get('priority', 'Medium'),
-                                row.get('lead_score', 0.0),
-                                row.get('assigned_to'),
-                                row.get('source_sheet'),
-                                row.get('lead_date'),
-                                row.get('notes'),
-                                int(row['id']),
-                                user_id
-                            ))
-                        else:
-                            # Insert new lead
-                            cursor.execute('''
-                                INSERT INTO leads (
-                                    user_id, full_name, phone_number, email, city, 
-                                    lead_status, priority, lead_score, assigned_to, 
-                                    source_sheet, lead_date, notes
-                                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                            ''', (
-                                user_id,
-                                row.get('full_name'),
-                                row.get('phone_number'),
-                                row.get('email'),
-                                row.get('city'),
-                                row.get('lead_status', 'New Lead'),
-                                row.get('priority', 'Medium'),
-                                row.get('lead_score', 0.0),
-                                row.get('assigned_to'),
-                                row.get('source_sheet'),
-                                row.get('lead_date'),
-                                row.get('notes')
-                            ))
+                    ids = [int(lead_id) if pd.notna(lead_id) else None for lead_id in leads_df['id'].tolist()]
                 else:
-                    # Clear existing leads and insert new ones
+                    # Replace the user's leads, keeping the ids (and history) of leads whose
+                    # phone number and email are already stored
                     logger.info(f"Replacing all leads for user {user_id} with {len(leads_df)} new leads")
-                    cursor.execute("DELETE FROM leads WHERE user_id = ?", (user_id,))
-                    
-                    # Insert new leads data
-                    for _, row in leads_df.iterrows():
-                        cursor.execute('''
-                            INSERT INTO leads (
-                                user_id, full_name, phone_number, email, city, 
-                                lead_status, priority, lead_score, assigned_to, 
-                                source_sheet, lead_date, notes
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            user_id,
-                            row.get('full_name'),
-                            row.get('phone_number'),
-                            row.get('email'),
-                            row.get('city'),
-                            row.get('lead_status', 'New Lead'),
-                            row.get('priority', 'Medium'),
-                            row.get('lead_score', 0.0),
-                            row.get('assigned_to'),
-                            row.get('source_sheet'),
-                            row.get('lead_date'),
-                            row.get('notes')
-                        ))
+                    ids = self._match_existing_leads(cursor, user_id, leads_df)
+                    kept_ids = set(ids) - {None}
+                    cursor.execute("SELECT id FROM leads WHERE user_id = ?", (user_id,))
+                    cursor.executemany(
+                        "DELETE FROM leads WHERE id = ?",
+                        [(lead_id,) for (lead_id,) in cursor.fetchall() if lead_id not in kept_ids]
+                    )
+                    logger.info(f"Matched {len(kept_ids)} leads already stored for user {user_id}")
+                
+                self._update_leads(cursor, user_id, [(lead_id, row) for lead_id, row in zip(ids, rows) if lead_id is not None])
+                
+                # Rows without an id are new leads
+                new_ids = iter(self._insert_leads(
+                    cursor, user_id, [row for lead_id, row in zip(ids, rows) if lead_id is None]
+                ))
+                lead_ids = [lead_id if lead_id is not None else next(new_ids) for lead_id in ids]
                 
                 conn.commit()
                 logger.info(f"Saved {len(leads_df)} leads for user {user_id}")
-                return True
+                return lead_ids
                 
         except Exception as e:
             logger.error(f"Error saving leads data: {str(e)}")
-            return False
+            return None
     
     def load_leads_data(self, user_id: str) -> pd.DataFrame:
         """Load leads data from database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                query = "SELECT * FROM leads WHERE user_id = ? ORDER BY created_at DESC"
-                df = pd.read_sql_query(query, conn, params=(user_id,))
+            with self.connection() as conn:
+                query = f"SELECT {', '.join(LEAD_LOAD_COLUMNS)} FROM leads WHERE user_id = ? ORDER BY created_at DESC"
+                df = pd.read_sql_query(query, conn, params=(user_id,), parse_dates=LEAD_TIMESTAMP_COLUMNS)
                 
                 if not df.empty:
-                    # Convert timestamp columns
-                    timestamp_columns = ['created_at', 'updated_at', 'status_updated_date', 'last_contact_date', 'follow_up_date']
-                    for col in timestamp_columns:
-                        if col in df.columns:
-                            df[col] = pd.to_datetime(df[col])
-                    
                     logger.info(f"Loaded {len(df)} leads for user {user_id}")
                 else:
                     logger.info(f"No leads found for user {user_id}")
@@ -213,20 +320,24 @@ class DatabaseManager:
     def update_lead_status(self, lead_id: int, new_status: str, notes: str, user_id: str) -> bool:
         """Update lead status in database"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
                 
                 # Debug logging
                 logger.info(f"Attempting to update lead {lead_id} for user {user_id}")
                 logger.info(f"New status: {new_status}, Notes: {notes}")
                 
-                # Get old values for audit log
-                cursor.execute("SELECT * FROM leads WHERE id = ? AND user_id = ?", (lead_id, user_id))
-                old_values = cursor.fetchone()
+                # Log the change first: SQLite reads the old values and builds both JSON
+                # documents itself, and no row is inserted if the lead doesn't exist
+                cursor.execute('''
+                    INSERT INTO audit_log (user_id, action, table_name, record_id, old_values, new_values)
+                    SELECT ?, 'UPDATE', 'leads', id,
+                           json_object('lead_status', lead_status, 'notes', notes),
+                           json_object('lead_status', ?, 'notes', ?)
+                    FROM leads WHERE id = ? AND user_id = ?
+                ''', (user_id, new_status, notes, lead_id, user_id))
                 
-                if old_values:
-                    logger.info(f"Found lead {lead_id} with old values: {old_values}")
-                    
+                if cursor.rowcount > 0:
                     # Update lead
                     update_query = '''
                         UPDATE leads 
@@ -245,25 +356,11 @@ class DatabaseManager:
                     logger.info(f"Rows affected by update: {rows_affected}")
                     
                     if rows_affected > 0:
-                        # Log the change
-                        try:
-                            cursor.execute('''
-                                INSERT INTO audit_log (user_id, action, table_name, record_id, old_values, new_values)
-                                VALUES (?, ?, ?, ?, ?, ?)
-                            ''', (
-                                user_id, 'UPDATE', 'leads', lead_id,
-                                json.dumps(dict(zip([col[0] for col in cursor.description], old_values))),
-                                json.dumps({'lead_status': new_status, 'notes': notes})
-                            ))
-                            logger.info("Audit log entry created successfully")
-                        except Exception as audit_error:
-                            logger.warning(f"Failed to create audit log entry: {audit_error}")
-                            # Continue even if audit logging fails
-                        
                         conn.commit()
                         logger.info(f"Successfully updated lead {lead_id} status to {new_status}")
                         return True
                     else:
+                        conn.rollback()
                         logger.warning(f"Update query affected 0 rows for lead {lead_id}")
                         return False
                 else:
@@ -281,10 +378,105 @@ class DatabaseManager:
             logger.error(f"Full traceback: {traceback.format_exc()}")
             return False
     
+    def bulk_update_lead_status(self, lead_ids: List[int], new_status: str, notes: str, user_id: str) -> int:
+        """Update the status of many leads in one transaction; returns the number of leads updated"""
+        if not lead_ids:
+            return 0
+
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                status_updated_date = datetime.now().isoformat()
+
+                cursor.executemany('''
+                    UPDATE leads
+                    SET lead_status = ?, notes = ?, status_updated_date = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ? AND user_id = ?
+                ''', [(new_status, notes, status_updated_date, lead_id, user_id) for lead_id in lead_ids])
+                rows_affected = cursor.rowcount
+
+                # Log the change
+                try:
+                    new_values = json.dumps({'lead_status': new_status, 'notes': notes})
+                    cursor.executemany('''
+                        INSERT INTO audit_log (user_id, action, table_name, record_id, new_values)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', [(user_id, 'UPDATE', 'leads', lead_id, new_values) for lead_id in lead_ids])
+                except Exception as audit_error:
+                    logger.warning(f"Failed to create audit log entries: {audit_error}")
+
+                conn.commit()
+                logger.info(f"Bulk updated {rows_affected} of {len(lead_ids)} leads to {new_status}")
+                return rows_affected
+
+        except Exception as e:
+            logger.error(f"Error bulk updating lead status: {str(e)}")
+            return 0
+
+    # Lead columns that may be changed through bulk_update_leads
+    EDITABLE_LEAD_FIELDS = ('full_name', 'phone_number', 'email', 'city', 'lead_status',
+                            'priority', 'assigned_to', 'notes')
+
+    def bulk_update_leads(self, updates: List[Dict[str, Any]], user_id: str) -> int:
+        """
+        Apply per-lead field edits in one transaction. Each update is a dict with the
+        lead 'id' plus any EDITABLE_LEAD_FIELDS; returns the number of leads updated
+        """
+        if not updates:
+            return 0
+
+        # Group edits touching the same set of fields so each group is one executemany
+        status_updated_date = datetime.now().isoformat()
+        groups: Dict[tuple, List[tuple]] = {}
+        for update in updates:
+            fields = tuple(field for field in self.EDITABLE_LEAD_FIELDS if field in update)
+            if fields:
+                row = tuple(update[field] for field in fields)
+                if 'lead_status' in fields:
+                    row += (status_updated_date,)
+                groups.setdefault(fields, []).append(row + (int(update['id']), user_id))
+
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                rows_affected = 0
+
+                for fields, rows in groups.items():
+                    assignments = ", ".join(f"{field} = ?" for field in fields)
+                    if 'lead_status' in fields:
+                        assignments += ", status_updated_date = ?"
+                    cursor.executemany(f'''
+                        UPDATE leads
+                        SET {assignments}, updated_at = CURRENT_TIMESTAMP
+                        WHERE id = ? AND user_id = ?
+                    ''', rows)
+                    rows_affected += cursor.rowcount
+
+                # Log the change
+                try:
+                    cursor.executemany('''
+                        INSERT INTO audit_log (user_id, action, table_name, record_id, new_values)
+                        VALUES (?, ?, ?, ?, ?)
+                    ''', [
+                        (user_id, 'UPDATE', 'leads', int(update['id']),
+                         json.dumps({k: v for k, v in update.items() if k != 'id'}))
+                        for update in updates
+                    ])
+                except Exception as audit_error:
+                    logger.warning(f"Failed to create audit log entries: {audit_error}")
+
+                conn.commit()
+                logger.info(f"Applied {len(updates)} pending lead updates ({rows_affected} rows)")
+                return rows_affected
+
+        except Exception as e:
+            logger.error(f"Error applying lead updates: {str(e)}")
+            return 0
+
     def get_leads_by_status(self, status: str, user_id: str) -> pd.DataFrame:
         """Get leads filtered by status"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
                 query = "SELECT * FROM leads WHERE lead_status = ? AND user_id = ? ORDER BY created_at DESC"
                 df = pd.read_sql_query(query, conn, params=(status, user_id))
                 return df
@@ -292,12 +484,40 @@ class DatabaseManager:
             logger.error(f"Error getting leads by status: {str(e)}")
             return pd.DataFrame()
     
+    def _init_leads_fts(self, conn) -> bool:
+        """
+        Create the leads_fts index and its triggers (indexing existing leads) if they don't
+        exist yet. Returns False when this SQLite build lacks FTS5 or the trigram tokenizer.
+        """
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'leads_fts'").fetchone()
+        if exists:
+            return True
+        try:
+            conn.executescript(f"SAVEPOINT leads_fts; {LEADS_FTS_SCHEMA} RELEASE leads_fts;")
+            logger.info("Created full-text search index for leads")
+            return True
+        except sqlite3.OperationalError as e:
+            conn.execute("ROLLBACK TO leads_fts")
+            conn.execute("RELEASE leads_fts")
+            logger.warning(f"Full-text search unavailable, searching with LIKE: {str(e)}")
+            return False
+    
     def search_leads(self, search_term: str, user_id: str, columns: List[str] = None) -> pd.DataFrame:
         """Search leads by term across specified columns"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
                 if not columns:
-                    columns = ['full_name', 'phone_number', 'email', 'city']
+                    columns = FTS_COLUMNS
+                
+                # Substring match through the trigram index when it covers the search
+                if self.fts_enabled and len(search_term) >= FTS_MIN_TERM_CHARS and set(columns) <= set(FTS_COLUMNS):
+                    quoted_term = '"' + search_term.replace('"', '""') + '"'
+                    query = """
+                        SELECT l.* FROM leads l JOIN leads_fts f ON l.id = f.rowid
+                        WHERE leads_fts MATCH ? AND l.user_id = ?
+                        ORDER BY l.created_at DESC
+                    """
+                    return pd.read_sql_query(query, conn, params=[f"{{{' '.join(columns)}}} : {quoted_term}", user_id])
                 
                 # Build search query
                 search_conditions = []
@@ -315,24 +535,29 @@ class DatabaseManager:
             logger.error(f"Error searching leads: {str(e)}")
             return pd.DataFrame()
     
-    def export_leads_report(self, user_id: str, format: str = 'csv') -> str:
-        """Export leads data in specified format"""
+    def _export_frame(self, user_id: str, page: int, page_size: int) -> pd.DataFrame:
+        """Leads data for one export page (at most page_size rows)"""
+        df = self.load_leads_data(user_id)
+        n_pages = export_page_count(len(df), page_size)
+        if n_pages > 1:
+            logger.warning(f"Export of {len(df)} leads exceeds {page_size} rows, writing page {page} of {n_pages}")
+            df = export_page(df, page, page_size)
+        return df
+    
+    def export_leads_report(self, user_id: str, format: str = 'csv', page: int = 1,
+                            page_size: int = MAX_EXPORT_ROWS) -> str:
+        """Export one page (at most page_size rows) of leads data in specified format"""
         try:
-            df = self.load_leads_data(user_id)
+            if format.lower() not in EXPORT_EXTENSIONS:
+                return f"Unsupported format: {format}"
+            
+            df = self._export_frame(user_id, page, page_size)
             
             if df.empty:
                 return "No data to export"
             
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            
-            if format.lower() == 'csv':
-                filename = f"leads_export_{timestamp}.csv"
-                df.to_csv(filename, index=False)
-            elif format.lower() == 'excel':
-                filename = f"leads_export_{timestamp}.xlsx"
-                df.to_excel(filename, index=False, engine='openpyxl')
-            else:
-                return f"Unsupported format: {format}"
+            # Repeated exports of unchanged data reuse the cached file
+            filename = cached_export(df, format)
             
             logger.info(f"Exported {len(df)} leads to {filename}")
             return filename
@@ -341,33 +566,52 @@ class DatabaseManager:
             logger.error(f"Error exporting leads: {str(e)}")
             return f"Export failed: {str(e)}"
     
+    def export_leads_bytes(self, user_id: str, format: str = 'csv', page: int = 1,
+                           page_size: int = MAX_EXPORT_ROWS) -> Optional[Tuple[str, bytes]]:
+        """
+        Export one page of leads data in memory for a download button. Returns
+        (file extension, file bytes), or None if there is no data or the export failed
+        """
+        try:
+            format = format.lower()
+            if format not in EXPORT_EXTENSIONS:
+                logger.error(f"Unsupported export format: {format}")
+                return None
+            
+            df = self._export_frame(user_id, page, page_size)
+            
+            if df.empty:
+                return None
+            
+            data = export_bytes(df, format)
+            logger.info(f"Exported {len(df)} leads in memory ({len(data)} bytes)")
+            return EXPORT_EXTENSIONS[format], data
+            
+        except Exception as e:
+            logger.error(f"Error exporting leads: {str(e)}")
+            return None
+    
     def get_user_stats(self, user_id: str) -> Dict[str, Any]:
         """Get user statistics"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
                 
-                # Total leads
-                cursor.execute("SELECT COUNT(*) FROM leads WHERE user_id = ?", (user_id,))
-                total_leads = cursor.fetchone()[0]
-                
-                # Leads by status
+                # One grouped scan; totals per status and per priority are summed from it
                 cursor.execute("""
-                    SELECT lead_status, COUNT(*) 
+                    SELECT lead_status, priority, COUNT(*) 
                     FROM leads 
                     WHERE user_id = ? 
-                    GROUP BY lead_status
+                    GROUP BY lead_status, priority
                 """, (user_id,))
-                status_counts = dict(cursor.fetchall())
                 
-                # Leads by priority
-                cursor.execute("""
-                    SELECT priority, COUNT(*) 
-                    FROM leads 
-                    WHERE user_id = ? 
-                    GROUP BY priority
-                """, (user_id,))
-                priority_counts = dict(cursor.fetchall())
+                total_leads = 0
+                status_counts = {}
+                priority_counts = {}
+                for status, priority, count in cursor.fetchall():
+                    total_leads += count
+                    status_counts[status] = status_counts.get(status, 0) + count
+                    priority_counts[priority] = priority_counts.get(priority, 0) + count
                 
                 return {
                     'total_leads': total_leads,
@@ -382,12 +626,12 @@ class DatabaseManager:
     def cleanup_old_data(self, days: int = 90) -> int:
         """Clean up old audit log entries"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute("""
-                    DELETE FROM audit_log 
-                    WHERE timestamp < datetime('now', '-{} days')
-                """.format(days))
+                # audit_log.timestamp holds UTC CURRENT_TIMESTAMP text, so the bound cutoff uses
+                # the same format and the delete is a range scan on idx_audit_ts
+                cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+                cursor.execute("DELETE FROM audit_log WHERE timestamp < ?", (cutoff,))
                 
                 deleted_count = cursor.rowcount
                 conn.commit()
@@ -398,3 +642,35 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Error cleaning up old data: {str(e)}")
             return 0
+    
+    def get_ai_answers(self, keys: List[str]) -> Dict[str, str]:
+        """Cached AI answers for the given cache keys (keys without an answer are omitted)"""
+        answers = {}
+        try:
+            with self.connection() as conn:
+                cursor = conn.cursor()
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    cursor.execute(
+                        f"SELECT key, response FROM ai_cache WHERE key IN ({', '.join('?' * len(chunk))})",
+                        chunk
+                    )
+                    answers.update(cursor.fetchall())
+                
+        except Exception as e:
+            logger.error(f"Error reading AI cache: {str(e)}")
+        
+        return answers
+    
+    def save_ai_answers(self, answers: Dict[str, str]):
+        """Store AI answers by cache key, replacing older answers for the same key"""
+        try:
+            with self.connection() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO ai_cache (key, response) VALUES (?, ?)",
+                    list(answers.items())
+                )
+                
+        except Exception as e:
+            logger.error(f"Error saving AI cache: {str(e)}")
@@ -0,0 +1,223 @@
+"""
+Export helpers for Bumuk Library CRM
+"""
+
+import atexit
+import functools
+import hashlib
+import io
+import logging
+import math
+import os
+import shutil
+import tempfile
+import time
+from typing import IO, Iterator, List, Union
+
+import pandas as pd
+
+from config import EXPORT_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# Rows converted to plain Python values per batch while writing Excel files
+EXCEL_WRITE_CHUNK_ROWS = 10_000
+
+# Rows formatted per batch while writing CSV files
+CSV_WRITE_CHUNK_ROWS = 10_000
+
+# Finished exports are cached keyed by the content hash of the exported data
+EXPORT_CACHE_NAME = 'exports'
+
+# Cache entries unused for longer than this are removed, as are the least recently used
+# entries once a cache directory holds more than CACHE_MAX_BYTES
+CACHE_TTL_SECONDS = 60 * 60
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+EXPORT_EXTENSIONS = {'csv': 'csv', 'excel': 'xlsx'}
+
+# RAM-backed filesystem used for intermediate files when it has room
+SHM_DIRECTORY = '/dev/shm'
+
+# Rough serialized size of one exported lead row, used to size-gate tmpfs staging
+ESTIMATED_ROW_BYTES = 512
+
+# Largest number of rows written into a single export file
+MAX_EXPORT_ROWS = EXPORT_CONFIG.get('max_rows', 500_000)
+
+
+def staging_dir(estimated_bytes: int = 0) -> str:
+    """
+    Directory for intermediate files: tmpfs when available and it has at least
+    twice the estimated size free, otherwise the regular temp directory
+    """
+    if os.path.isdir(SHM_DIRECTORY):
+        try:
+            stats = os.statvfs(SHM_DIRECTORY)
+            if stats.f_bavail * stats.f_frsize > 2 * estimated_bytes:
+                return SHM_DIRECTORY
+        except OSError:
+            pass
+    return tempfile.gettempdir()
+
+
+@functools.lru_cache(maxsize=None)
+def private_cache_dir(name: str) -> str:
+    """
+    Cache directory for lead data, created on first use with mode 0700 (readable only by
+    this user) under a unique name, and removed when the process exits
+    """
+    path = tempfile.mkdtemp(prefix=f"bumuk_{name}_")
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def touch_cache_entry(path: str):
+    """Mark a cache entry as just used, so eviction keeps it longest"""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def evict_cache_entries(directory: str, ttl_seconds: int = CACHE_TTL_SECONDS, max_bytes: int = CACHE_MAX_BYTES):
+    """Remove expired cache files, then the least recently used ones beyond max_bytes"""
+    now = time.time()
+    with os.scandir(directory) as entries:
+        files = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in entries if entry.is_file()]
+    files.sort(reverse=True)
+
+    total_bytes = 0
+    for mtime, size, path in files:
+        total_bytes += size
+        if now - mtime > ttl_seconds or total_bytes > max_bytes:
+            try:
+                os.remove(path)
+            except OSError as e:
+                logger.warning(f"Could not evict cache entry {path}: {str(e)}")
+
+
+def export_page_count(n_rows: int, page_size: int = MAX_EXPORT_ROWS) -> int:
+    """Number of export pages needed for n_rows (at least one)"""
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def export_page(df: pd.DataFrame, page: int = 1, page_size: int = MAX_EXPORT_ROWS) -> pd.DataFrame:
+    """Rows belonging to a 1-based export page"""
+    return df.iloc[(page - 1) * page_size:page * page_size]
+
+
+def iter_excel_rows(df: pd.DataFrame) -> Iterator[tuple]:
+    """Yield data rows as plain tuples with missing values blanked out"""
+    for start in range(0, len(df), EXCEL_WRITE_CHUNK_ROWS):
+        chunk = df.iloc[start:start + EXCEL_WRITE_CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def _write_with_xlsxwriter(df: pd.DataFrame, target, sheet_name: str):
+    """Stream rows into a workbook using xlsxwriter's constant_memory mode"""
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(target, {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+        'remove_timezone': True,
+        'nan_inf_to_errors': True,
+        'strings_to_urls': False,
+        'tmpdir': staging_dir(len(df) * ESTIMATED_ROW_BYTES)
+    })
+    worksheet = workbook.add_worksheet(sheet_name)
+    worksheet.write_row(0, 0, [str(col) for col in df.columns])
+    for row_idx, row in enumerate(iter_excel_rows(df), start=1):
+        worksheet.write_row(row_idx, 0, row)
+    workbook.close()
+
+
+def _write_with_openpyxl(df: pd.DataFrame, target, sheet_name: str):
+    """Append rows to an openpyxl write-only workbook"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(sheet_name)
+    worksheet.append([str(col) for col in df.columns])
+    for row in iter_excel_rows(df):
+        worksheet.append(row)
+    workbook.save(target)
+
+
+def write_excel(df: pd.DataFrame, target: Union[str, IO[bytes]], sheet_name: str = 'Leads') -> str:
+    """
+    Write a DataFrame to an .xlsx path or binary buffer without building per-row Series.
+    Rows are streamed through xlsxwriter's constant_memory mode, with openpyxl write-only
+    mode as a fallback. Returns the name of the engine that was used.
+    """
+    writers = [('xlsxwriter', _write_with_xlsxwriter), ('openpyxl', _write_with_openpyxl)]
+
+    errors: List[str] = []
+    for engine, writer in writers:
+        try:
+            writer(df, target, sheet_name)
+            return engine
+        except ImportError:
+            logger.warning(f"Excel engine '{engine}' not available, trying next...")
+            errors.append(f"{engine} not installed")
+        finally:
+            if hasattr(target, 'seek'):
+                target.seek(0)
+
+    raise ImportError(f"No Excel engine available: {', '.join(errors)}")
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame (columns + values) used to key export caches"""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def export_bytes(df: pd.DataFrame, format: str) -> bytes:
+    """Serialize df as CSV or Excel straight into memory, without touching the filesystem"""
+    format = format.lower()
+    if format not in EXPORT_EXTENSIONS:
+        raise ValueError(f"Unsupported format: {format}")
+
+    output = io.BytesIO()
+    if format == 'csv':
+        # Encode in chunks instead of building one big str
+        df.to_csv(output, index=False, chunksize=CSV_WRITE_CHUNK_ROWS)
+    else:
+        write_excel(df, output)
+    return output.getvalue()
+
+
+def cached_export(df: pd.DataFrame, format: str) -> str:
+    """
+    Return the path of an export file for df, writing it only if an identical
+    dataset has not been exported before
+    """
+    format = format.lower()
+    if format not in EXPORT_EXTENSIONS:
+        raise ValueError(f"Unsupported format: {format}")
+
+    extension = EXPORT_EXTENSIONS[format]
+    cache_dir = private_cache_dir(EXPORT_CACHE_NAME)
+    signature = dataframe_fingerprint(df)
+    path = os.path.join(cache_dir, f"{signature}.{extension}")
+
+    if os.path.exists(path):
+        touch_cache_entry(path)
+        logger.info(f"Reusing cached export {path}")
+        return path
+
+    partial_path = os.path.join(cache_dir, f"{signature}.partial.{extension}")
+    if format == 'csv':
+        df.to_csv(partial_path, index=False, chunksize=CSV_WRITE_CHUNK_ROWS)
+    else:
+        write_excel(df, partial_path)
+    os.replace(partial_path, path)
+    evict_cache_entries(cache_dir)
+
+    logger.info(f"Wrote export cache entry {path}")
+    return path
@@ -0,0 +1,208 @@
+"""
+Lead filtering helpers for Bumuk Library CRM
+"""
+
+import importlib.util
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import LEAD_STATUSES, PRIORITY_LEVELS
+
+logger = logging.getLogger(__name__)
+
+# numba is optional; without it the pandas comparisons below are used. It is only
+# imported the first time a large frame is filtered to keep app start-up fast
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+# Below this many rows the JIT kernel isn't worth its dispatch overhead
+NUMBA_MIN_ROWS = 100_000
+
+# Plain range until numba is loaded; replaced by numba.prange in _numba_kernel
+prange = range
+
+_compiled_kernel = None
+_compiled_follow_up_kernel = None
+
+# Bits set per lead by follow_up_flags
+FOLLOW_UP_OVERDUE = 1
+FOLLOW_UP_URGENT = 2
+FOLLOW_UP_TODAY = 4
+FOLLOW_UP_WEEK = 8
+
+# Priorities whose overdue leads count as urgent
+URGENT_PRIORITIES = ['High', 'Urgent']
+
+# Known values of the enum columns, which fix their category order wherever leads are
+# categorized: statuses in pipeline order, priorities from least to most urgent
+KNOWN_CATEGORIES = {'lead_status': LEAD_STATUSES, 'priority': PRIORITY_LEVELS}
+
+NAT_I8 = np.iinfo(np.int64).min
+NS_PER_DAY = 86_400 * 10**9
+
+
+def _codes_equal_mask(codes, wanted):
+    """Fused pass over categorical codes (one row of codes per filter column)"""
+    n_rows = codes.shape[1]
+    mask = np.ones(n_rows, dtype=np.bool_)
+    for i in prange(n_rows):
+        for k in range(codes.shape[0]):
+            if codes[k, i] != wanted[k]:
+                mask[i] = False
+                break
+    return mask
+
+
+def _classify_follow_ups(status_codes, schedule_days, updated, contacted, stored,
+                        priority_codes, urgent_lookup, now, overdue_cutoff, today_cutoff, week_cutoff):
+    """
+    Fused pass computing each lead's follow-up date (last status update, else last contact,
+    else now, plus its status's delay; the stored date for unscheduled statuses) and its
+    FOLLOW_UP_* bits. Dates are int64 nanoseconds with NAT_I8 for missing values.
+    """
+    n_rows = status_codes.shape[0]
+    flags = np.zeros(n_rows, dtype=np.uint8)
+    for i in prange(n_rows):
+        flag = 0
+        if stored[i] != NAT_I8 and stored[i] <= overdue_cutoff:
+            flag |= FOLLOW_UP_OVERDUE
+            if priority_codes[i] >= 0 and urgent_lookup[priority_codes[i]]:
+                flag |= FOLLOW_UP_URGENT
+
+        follow_up = stored[i]
+        code = status_codes[i]
+        if code >= 0 and not np.isnan(schedule_days[code]):
+            base = updated[i]
+            if base == NAT_I8:
+                base = contacted[i]
+            if base == NAT_I8:
+                base = now
+            follow_up = base + np.int64(schedule_days[code] * NS_PER_DAY)
+
+        if follow_up != NAT_I8:
+            if follow_up <= today_cutoff:
+                flag |= FOLLOW_UP_TODAY
+            if follow_up <= week_cutoff:
+                flag |= FOLLOW_UP_WEEK
+        flags[i] = flag
+    return flags
+
+
+def _jit(func):
+    """JIT-compile a kernel with numba (reusing its on-disk cache), importing numba on first use"""
+    global prange
+    from numba import njit, prange
+    logger.info(f"Compiling numba kernel {func.__name__}")
+    return njit(cache=True, parallel=True)(func)
+
+
+def _numba_kernel():
+    """JIT-compile _codes_equal_mask on first use"""
+    global _compiled_kernel
+    if _compiled_kernel is None:
+        _compiled_kernel = _jit(_codes_equal_mask)
+    return _compiled_kernel
+
+
+def _follow_up_kernel():
+    """JIT-compile _classify_follow_ups on first use"""
+    global _compiled_follow_up_kernel
+    if _compiled_follow_up_kernel is None:
+        _compiled_follow_up_kernel = _jit(_classify_follow_ups)
+    return _compiled_follow_up_kernel
+
+
+def _datetime_i8(df: pd.DataFrame, column: str) -> np.ndarray:
+    """Column as int64 nanoseconds (NAT_I8 where missing or absent)"""
+    if column not in df.columns:
+        return np.full(len(df), NAT_I8, dtype=np.int64)
+    values = pd.to_datetime(df[column], errors='coerce')
+    return values.to_numpy(dtype='datetime64[ns]').view(np.int64)
+
+
+def follow_up_flags(df: pd.DataFrame, schedule: Dict[str, int], now, overdue_days: int) -> Optional[np.ndarray]:
+    """
+    FOLLOW_UP_* bits for every lead from one numba pass: overdue (stored follow-up date more
+    than overdue_days ago), urgent (overdue with a high priority), and a scheduled follow-up
+    due within one or seven days. Returns None when numba is unavailable, the frame is small
+    or lead_status/priority are not categorical, so callers use their pandas path instead.
+    """
+    if not (
+        NUMBA_AVAILABLE
+        and len(df) >= NUMBA_MIN_ROWS
+        and all(
+            col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)
+            for col in ('lead_status', 'priority')
+        )
+    ):
+        return None
+
+    statuses = df['lead_status'].cat
+    priorities = df['priority'].cat
+    schedule_days = np.array([schedule.get(status, np.nan) for status in statuses.categories], dtype=np.float64)
+    urgent_lookup = priorities.categories.isin(URGENT_PRIORITIES)
+
+    now_i8 = pd.Timestamp(now).as_unit('ns').value
+    return _follow_up_kernel()(
+        statuses.codes.to_numpy(dtype=np.int64),
+        schedule_days,
+        _datetime_i8(df, 'status_updated_date'),
+        _datetime_i8(df, 'last_contact_date'),
+        _datetime_i8(df, 'follow_up_date'),
+        priorities.codes.to_numpy(dtype=np.int64),
+        urgent_lookup,
+        now_i8,
+        now_i8 - overdue_days * NS_PER_DAY,
+        now_i8 + NS_PER_DAY,
+        now_i8 + 7 * NS_PER_DAY
+    )
+
+
+def known_category_dtype(values: pd.Series, known) -> pd.CategoricalDtype:
+    """Categorical dtype with the known values first and any unexpected values appended"""
+    known_set = set(known)
+    extras = [value for value in pd.unique(values.dropna()) if value not in known_set]
+    return pd.CategoricalDtype(list(known) + extras)
+
+
+def categorize_known_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Shallow copy of df with each KNOWN_CATEGORIES column stored as a categorical"""
+    df = df.copy(deep=False)
+    for col, known in KNOWN_CATEGORIES.items():
+        if col in df.columns and not isinstance(df[col], pd.DataFrame):
+            df[col] = df[col].astype(known_category_dtype(df[col], known))
+    return df
+
+
+def equality_mask(df: pd.DataFrame, filters: Dict[str, str]) -> np.ndarray:
+    """
+    Boolean mask of rows whose columns equal every value in filters. Large frames
+    with categorical columns are filtered in a single numba pass over the codes.
+    """
+    active = [(col, value) for col, value in filters.items() if col in df.columns]
+    if not active:
+        return np.ones(len(df), dtype=bool)
+
+    use_numba = (
+        NUMBA_AVAILABLE
+        and len(df) >= NUMBA_MIN_ROWS
+        and all(isinstance(df[col].dtype, pd.CategoricalDtype) for col, _ in active)
+    )
+
+    if use_numba:
+        codes = np.empty((len(active), len(df)), dtype=np.int32)
+        wanted = np.empty(len(active), dtype=np.int32)
+        for k, (col, value) in enumerate(active):
+            categories = df[col].cat.categories
+            if value not in categories:
+                return np.zeros(len(df), dtype=bool)
+            codes[k] = df[col].cat.codes.to_numpy()
+            wanted[k] = categories.get_loc(value)
+        return _numba_kernel()(codes, wanted)
+
+    mask = np.ones(len(df), dtype=bool)
+    for col, value in active:
+        mask &= (df[col] == value).to_numpy(dtype=bool)
+    return mask
@@ -1,21 +1,95 @@
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import feather
+from collections import Counter
 from datetime import datetime, timedelta
+import json
 import logging
 import os
+import time
 from typing import Dict, List, Optional, Tuple
 from data_cleaner import LeadsDataCleaner
+from export_utils import CSV_WRITE_CHUNK_ROWS, write_excel
+from filter_utils import (
+    FOLLOW_UP_OVERDUE, FOLLOW_UP_TODAY, FOLLOW_UP_URGENT, FOLLOW_UP_WEEK, URGENT_PRIORITIES, follow_up_flags
+)
 
 logger = logging.getLogger(__name__)
 
+# Saved CRM state: the latest snapshot (Feather, rewritten on every save), timestamped Parquet
+# backups, the status notes table and a log of the status changes not yet in the snapshot
+# (replayed on load, cleared once a snapshot is written). The Parquet and .xlsx snapshots are
+# earlier formats, still read when no Feather snapshot exists; Excel files are otherwise only
+# written by export_leads_report
+DATA_DIR = "crm_data"
+SNAPSHOT_PATH = os.path.join(DATA_DIR, "leads_data_latest.feather")
+PARQUET_SNAPSHOT_PATH = os.path.join(DATA_DIR, "leads_data_latest.parquet")
+LEGACY_SNAPSHOT_PATH = os.path.join(DATA_DIR, "leads_data_latest.xlsx")
+EVENTS_PATH = os.path.join(DATA_DIR, "events.jsonl")
+NOTES_PATH = os.path.join(DATA_DIR, "status_notes.parquet")
+
+# Leads are identified by their index label, named LEAD_ID_COLUMN and saved with the
+# snapshots, so ids (and the notes keyed on them) survive reloads and removed rows
+LEAD_ID_COLUMN = 'lead_id'
+
+# Status notes are kept long-form, one row per status change of a lead, instead of being
+# concatenated into a growing text cell
+NOTE_COLUMNS = [LEAD_ID_COLUMN, 'timestamp', 'status', 'note']
+
+# Minimum time between timestamped backups; the latest snapshot is always rewritten
+BACKUP_MIN_INTERVAL_SECONDS = 30
+
+# zstd level for the Parquet backups (fast to write, still well compressed)
+BACKUP_ZSTD_LEVEL = 3
+
+# Inferred types of object columns holding values of more than one type (e.g. ages entered
+# as both 5 and '6-8'); Arrow stores one type per column, so these are saved as text
+MIXED_INFERRED_TYPES = ('mixed', 'mixed-integer')
+
+# Tracking columns maintained by status updates, with the value a newly added column starts with
+STATUS_TRACKING_DEFAULTS = {
+    'status_updated_date': None,
+    'follow_up_count': 0,
+    'last_contact_date': None
+}
+
+# Columns whose value counts are kept by get_sales_pipeline_summary and updated incrementally
+PIPELINE_COUNT_COLUMNS = ['lead_status', 'priority', 'assigned_to']
+
+# Statuses counted as contacted in the pipeline contact rate
+CONTACTED_STATUSES = ['Contacted', 'Qualified', 'Proposal Sent', 'Negotiation', 'Closed Won', 'Closed Lost']
+
+def observed_counts(values: pd.Series) -> Dict:
+    """Value counts as a dict, without the zero counts of unused categories"""
+    counts = values.value_counts()
+    return counts[counts > 0].to_dict()
+
+def arrow_table(df: pd.DataFrame) -> pa.Table:
+    """Arrow table of df and its lead ids for the saved snapshots, with mixed-type object columns as text"""
+    mixed = {
+        col: df[col].astype(str).where(df[col].notna(), None)
+        for col in df.columns[(df.dtypes == object).to_numpy()]
+        if pd.api.types.infer_dtype(df[col], skipna=True) in MIXED_INFERRED_TYPES
+    }
+    if mixed:
+        df = df.assign(**mixed)
+    return pa.Table.from_pandas(df.rename_axis(LEAD_ID_COLUMN), preserve_index=True)
+
 class LeadManager:
     """
     Comprehensive lead management system for Bumuk Library CRM
     """
     
     def __init__(self):
+        self._pipeline_counts = None
         self.leads_data = None
+        self.notes_data = pd.DataFrame(columns=NOTE_COLUMNS)
+        # Notes added since notes_data was last rebuilt, as NOTE_COLUMNS tuples
+        self._pending_notes = []
         self.sales_team = []
+        self._last_backup_time = None
         
         # Load configurations
         from config import LEAD_STATUSES, PRIORITY_LEVELS, FOLLOW_UP_SCHEDULE, FOLLOW_UP_ALERTS
@@ -25,6 +99,18 @@ class LeadManager:
         self.follow_up_schedule = FOLLOW_UP_SCHEDULE
         self.follow_up_alerts = FOLLOW_UP_ALERTS
         
+    @property
+    def leads_data(self) -> Optional[pd.DataFrame]:
+        return self._leads_data
+    
+    @leads_data.setter
+    def leads_data(self, df: Optional[pd.DataFrame]):
+        # Assign a new frame, or change existing leads through _write_leads, so the cached
+        # pipeline counts stay in step with the data
+        self._leads_data = df
+        # Counts are rebuilt from the new frame by the next pipeline summary
+        self._pipeline_counts = None
+    
     def load_cleaned_leads(self, file_path: str, enable_ai: bool = False) -> pd.DataFrame:
         """
         Load and clean leads data using the data cleaner
@@ -36,8 +122,10 @@ class LeadManager:
             if enable_ai:
                 cleaner.setup_openai()
             
-            # Clean all data from multiple sheets
-            self.leads_data = cleaner.clean_all_data(file_path, enable_ai_enrichment=enable_ai)
+            # Clean all data from multiple sheets; each lead gets its id from its position here
+            self.leads_data = cleaner.clean_all_data(file_path, enable_ai_enrichment=enable_ai).reset_index(drop=True)
+            self.notes_data = pd.DataFrame(columns=NOTE_COLUMNS)
+            self._pending_notes = []
             
             logger.info(f"Successfully loaded {len(self.leads_data)} cleaned leads")
             return self.leads_data
@@ -53,20 +141,23 @@ class LeadManager:
         if self.leads_data is None:
             raise ValueError("No leads data loaded. Run load_cleaned_leads() first.")
         
-        df = self.leads_data.copy()
+        df = self.leads_data.copy(deep=False)
         
         # Round-robin assignment
-        df['assigned_to'] = [sales_team_members[i % len(sales_team_members)] 
-                           for i in range(len(df))]
+        team = np.asarray(sales_team_members, dtype=object)
+        positions = np.arange(len(df))
+        assigned = team[positions % len(team)]
         
         # Priority-based assignment for high-value leads
-        high_priority_mask = df['priority'] == 'High'
+        high_priority_mask = (df['priority'] == 'High').to_numpy(dtype=bool)
         if high_priority_mask.any():
             # Assign high priority leads to top performers
-            top_performers = sales_team_members[:min(2, len(sales_team_members))]
-            high_priority_indices = df[high_priority_mask].index
-            for idx in high_priority_indices:
-                df.loc[idx, 'assigned_to'] = top_performers[idx % len(top_performers)]
+            top_performers = team[:min(2, len(team))]
+            high_priority_positions = positions[high_priority_mask]
+            assigned[high_priority_positions] = top_performers[high_priority_positions % len(top_performers)]
+        
+        # Stored as a categorical over the team so filters and counts compare integer codes
+        df['assigned_to'] = pd.Categorical(assigned, categories=pd.unique(team))
         
         self.leads_data = df
         logger.info(f"Assigned {len(df)} leads to {len(sales_team_members)} sales team members")
@@ -75,89 +166,135 @@ class LeadManager:
     
     def update_lead_status(self, lead_id: int, new_status: str, notes: str = "") -> bool:
         """
-        Update the status of a specific lead and save to permanent storage
+        Update the status of a specific lead and save to permanent storage. Returns False
+        if the lead or status is unknown, or the change could not be saved
         """
         if self.leads_data is None:
             return False
         
-        if lead_id >= len(self.leads_data):
+        if lead_id not in self.leads_data.index:
             return False
         
         if new_status not in self.lead_statuses:
             return False
         
-        # Update status
-        self.leads_data.loc[lead_id, 'lead_status'] = new_status
-        
-        # Add timestamp
-        if 'status_updated_date' not in self.leads_data.columns:
-            self.leads_data['status_updated_date'] = None
-        
-        self.leads_data.loc[lead_id, 'status_updated_date'] = datetime.now()
-        
-        # Add notes
-        if 'status_notes' not in self.leads_data.columns:
-            self.leads_data['status_notes'] = ""
+        self._ensure_status_columns()
+        now = datetime.now()
         
-        current_notes = self.leads_data.loc[lead_id, 'status_notes']
-        new_note = f"{datetime.now().strftime('%Y-%m-%d %H:%M')}: {new_status} - {notes}"
-        
-        if pd.isna(current_notes) or current_notes == "":
-            self.leads_data.loc[lead_id, 'status_notes'] = new_note
-        else:
-            self.leads_data.loc[lead_id, 'status_notes'] = current_notes + "\n" + new_note
-        
-        # Update follow-up count if moving to follow-up status
-        if 'follow_up_count' not in self.leads_data.columns:
-            self.leads_data['follow_up_count'] = 0
-            
+        # Update status and timestamps (and the follow-up count if moving to follow-up
+        # status) in one row write
+        updates = {
+            'lead_status': new_status,
+            'status_updated_date': now,
+            'last_contact_date': now
+        }
         if 'follow_up' in new_status.lower():
-            current_count = self.leads_data.loc[lead_id, 'follow_up_count']
-            self.leads_data.loc[lead_id, 'follow_up_count'] = current_count + 1
+            updates['follow_up_count'] = self.leads_data.at[lead_id, 'follow_up_count'] + 1
+        self._write_leads([lead_id], updates)
         
-        # Set last contact date
-        if 'last_contact_date' not in self.leads_data.columns:
-            self.leads_data['last_contact_date'] = None
-        
-        self.leads_data.loc[lead_id, 'last_contact_date'] = datetime.now()
+        # Add notes once the lead itself has been updated
+        self._pending_notes.append((lead_id, now, new_status, notes))
         
         # Auto-advance status if needed
         self._auto_advance_status(lead_id, new_status)
         
-        # Save to permanent storage
-        self._save_leads_data()
+        # Save to permanent storage; a failed save is reported to the caller
+        if not self._save_leads_data({'lead_ids': [lead_id], 'status': new_status, 'notes': notes, 'timestamp': now.isoformat()}):
+            return False
         
         logger.info(f"Updated lead {lead_id} status to {new_status} and saved to storage")
         return True
     
-    def _save_leads_data(self):
+    def _write_leads(self, rows, values: Dict):
+        """
+        Write values (column -> value or per-row values) to rows (a list of lead ids or a
+        boolean mask). Every change LeadManager makes to existing leads goes through here: the
+        columns are written on a shallow copy that replaces leads_data only once every write
+        succeeded, and the cached pipeline counts of any counted column are adjusted with it
+        """
+        df = self.leads_data.copy(deep=False)
+        counted = [col for col in values if col in PIPELINE_COUNT_COLUMNS] if self._pipeline_counts is not None else []
+        old_counts = {col: df.loc[rows, col].value_counts().to_dict() for col in counted if col in df.columns}
+        
+        for col, value in values.items():
+            df.loc[rows, col] = value
+        self._leads_data = df
+        
+        for col in counted:
+            column_counts = self._pipeline_counts.get(col)
+            if column_counts is None:
+                # A counted column that didn't exist when the counts were built
+                self._pipeline_counts = None
+                return
+            column_counts.subtract(old_counts.get(col, {}))
+            column_counts.update(df.loc[rows, col].value_counts().to_dict())
+    
+    def _flush_notes(self) -> pd.DataFrame:
+        """Move pending notes into notes_data and return it"""
+        if self._pending_notes:
+            pending = pd.DataFrame(self._pending_notes, columns=NOTE_COLUMNS)
+            self.notes_data = pending if self.notes_data.empty else pd.concat([self.notes_data, pending], ignore_index=True)
+            self._pending_notes = []
+        return self.notes_data
+    
+    def get_lead_notes(self, lead_id: int) -> pd.DataFrame:
         """
-        Save leads data to permanent storage
+        Status notes recorded for a lead, oldest first
+        """
+        notes_data = self._flush_notes()
+        return notes_data[notes_data['lead_id'] == lead_id]
+    
+    def _ensure_status_columns(self):
+        """Add any missing status tracking columns in one step"""
+        missing = {col: default for col, default in STATUS_TRACKING_DEFAULTS.items() if col not in self.leads_data.columns}
+        if missing:
+            self.leads_data = self.leads_data.assign(**missing)
+    
+    def _save_leads_data(self, event: Optional[Dict] = None):
+        """
+        Save leads data to permanent storage: append the change to the event log, rewrite
+        the Feather snapshot (after which the log is cleared), and keep a timestamped Parquet
+        backup at most every BACKUP_MIN_INTERVAL_SECONDS
         """
         if self.leads_data is None:
             return False
         
         try:
             # Create data directory if it doesn't exist
-            data_dir = "crm_data"
-            if not os.path.exists(data_dir):
-                os.makedirs(data_dir)
+            os.makedirs(DATA_DIR, exist_ok=True)
             
-            # Save to Excel file with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"crm_data/leads_data_{timestamp}.xlsx"
+            # Record the change as one appended line first, so it is replayed on load if the
+            # snapshot below isn't written
+            if event is not None:
+                with open(EVENTS_PATH, 'a', encoding='utf-8') as events_file:
+                    events_file.write(json.dumps(event, default=str) + "\n")
             
-            # Save current data
-            self.leads_data.to_excel(filename, index=False, engine='openpyxl')
+            # Replace the snapshot atomically so readers never see a partial file. Feather
+            # skips Parquet's encoding work, which matters on this per-update path
+            partial_path = f"{SNAPSHOT_PATH}.partial"
+            feather.write_feather(arrow_table(self.leads_data), partial_path, compression='lz4')
+            os.replace(partial_path, SNAPSHOT_PATH)
             
-            # Also save as latest version (overwrites)
-            latest_filename = "crm_data/leads_data_latest.xlsx"
-            self.leads_data.to_excel(latest_filename, index=False, engine='openpyxl')
+            partial_path = f"{NOTES_PATH}.partial"
+            self._flush_notes().to_parquet(partial_path, index=False, compression='zstd')
+            os.replace(partial_path, NOTES_PATH)
+            
+            # The snapshot now holds every logged change
+            if os.path.exists(EVENTS_PATH):
+                os.remove(EVENTS_PATH)
             
             # Save backup (keep last 5 versions)
-            self._cleanup_old_backups()
+            now = time.monotonic()
+            if self._last_backup_time is None or now - self._last_backup_time >= BACKUP_MIN_INTERVAL_SECONDS:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                pq.write_table(
+                    arrow_table(self.leads_data), os.path.join(DATA_DIR, f"leads_data_{timestamp}.parquet"),
+                    compression='zstd', compression_level=BACKUP_ZSTD_LEVEL
+                )
+                self._last_backup_time = now
+                self._cleanup_old_backups()
             
-            logger.info(f"Leads data saved to {filename}")
+            logger.info(f"Leads data saved to {SNAPSHOT_PATH}")
             return True
             
         except Exception as e:
@@ -169,19 +306,22 @@ class LeadManager:
         Keep only the last 5 backup files
         """
         try:
-            data_dir = "crm_data"
-            if not os.path.exists(data_dir):
+            if not os.path.exists(DATA_DIR):
                 return
             
-            # Get all backup files
-            backup_files = [f for f in os.listdir(data_dir) if f.startswith("leads_data_") and f.endswith(".xlsx")]
-            backup_files.sort(reverse=True)  # Sort by name (timestamp)
+            # Get all backup files (a snapshot saved in the earlier Parquet format is not a backup)
+            snapshot_name = os.path.basename(PARQUET_SNAPSHOT_PATH)
+            with os.scandir(DATA_DIR) as entries:
+                backup_files = [
+                    entry for entry in entries
+                    if entry.name.startswith("leads_data_") and entry.name.endswith(".parquet") and entry.name != snapshot_name
+                ]
+            backup_files.sort(key=lambda entry: entry.name, reverse=True)  # Sort by name (timestamp)
             
             # Remove old backups (keep only last 5)
-            if len(backup_files) > 5:
-                for old_file in backup_files[5:]:
-                    os.remove(os.path.join(data_dir, old_file))
-                    logger.info(f"Removed old backup: {old_file}")
+            for old_file in backup_files[5:]:
+                os.remove(old_file.path)
+                logger.info(f"Removed old backup: {old_file.name}")
                     
         except Exception as e:
             logger.error(f"Failed to cleanup old backups: {str(e)}")
@@ -191,20 +331,50 @@ class LeadManager:
         Load leads data from permanent storage
         """
         try:
-            latest_filename = "crm_data/leads_data_latest.xlsx"
+            self.notes_data = pd.read_parquet(NOTES_PATH) if os.path.exists(NOTES_PATH) else pd.DataFrame(columns=NOTE_COLUMNS)
+            self._pending_notes = []
             
-            if os.path.exists(latest_filename):
-                self.leads_data = pd.read_excel(latest_filename)
-                logger.info(f"Loaded saved leads data from {latest_filename}")
-                return True
+            if os.path.exists(SNAPSHOT_PATH):
+                # Arrow hands back read-only buffers (e.g. categorical codes); copy them so
+                # status updates can write to the loaded frame
+                self.leads_data = pd.read_feather(SNAPSHOT_PATH).copy()
+                logger.info(f"Loaded saved leads data from {SNAPSHOT_PATH}")
+            elif os.path.exists(PARQUET_SNAPSHOT_PATH):
+                self.leads_data = pd.read_parquet(PARQUET_SNAPSHOT_PATH).copy()
+                logger.info(f"Loaded saved leads data from {PARQUET_SNAPSHOT_PATH}")
+            elif os.path.exists(LEGACY_SNAPSHOT_PATH):
+                # Excel does not keep dtypes, so restore the categorical status/priority columns
+                self.leads_data = LeadsDataCleaner().optimize_dtypes(pd.read_excel(LEGACY_SNAPSHOT_PATH))
+                logger.info(f"Loaded saved leads data from {LEGACY_SNAPSHOT_PATH}")
             else:
                 logger.info("No saved leads data found")
                 return False
+            
+            self._replay_events()
+            return True
                 
         except Exception as e:
             logger.error(f"Failed to load saved leads data: {str(e)}")
             return False
     
+    def _replay_events(self):
+        """
+        Apply the status changes logged after the last snapshot was written
+        """
+        if not os.path.exists(EVENTS_PATH):
+            return
+        
+        with open(EVENTS_PATH, encoding='utf-8') as events_file:
+            events = [json.loads(line) for line in events_file if line.strip()]
+        
+        # Each event's status change and notes are applied together; if one fails the load
+        # fails and the log is kept for the next attempt
+        for event in events:
+            self._apply_status_change(
+                event['lead_ids'], event['status'], event['notes'], datetime.fromisoformat(event['timestamp'])
+            )
+        logger.info(f"Replayed {len(events)} status changes from {EVENTS_PATH}")
+    
     def _auto_advance_status(self, lead_id: int, current_status: str):
         """
         Automatically advance lead status based on business rules
@@ -225,7 +395,7 @@ class LeadManager:
                     pass
                 else:
                     # Move to re-engagement later
-                    self.leads_data.loc[lead_id, 'lead_status'] = 'Re-engage Later'
+                    self._write_leads([lead_id], {'lead_status': 'Re-engage Later'})
                     logger.info(f"Auto-advanced lead {lead_id} to 'Re-engage Later' after 3 follow-ups")
     
     def get_leads_by_status(self, status: str) -> pd.DataFrame:
@@ -255,6 +425,23 @@ class LeadManager:
         
         return self.leads_data[self.leads_data['assigned_to'] == sales_person]
     
+    def _scheduled_follow_up_dates(self, df: pd.DataFrame, today: datetime) -> pd.Series:
+        """
+        Follow-up date of every lead, computed for all leads at once: the last status update,
+        else the last contact, else now, plus the delay scheduled for its status
+        """
+        def dates(name):
+            if name in df.columns:
+                return pd.to_datetime(df[name], errors='coerce')
+            return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+        
+        days_to_add = df['lead_status'].map(self.follow_up_schedule).astype(float)
+        base_date = dates('status_updated_date').fillna(dates('last_contact_date')).fillna(pd.Timestamp(today))
+        scheduled = base_date + pd.to_timedelta(days_to_add, unit='D')
+        
+        # Statuses without a schedule keep whatever follow-up date they already had
+        return scheduled.where(days_to_add.notna(), dates('follow_up_date'))
+    
     def get_leads_needing_follow_up(self, days_threshold: int = 7) -> pd.DataFrame:
         """
         Get leads that need follow-up based on status and schedule
@@ -262,7 +449,7 @@ class LeadManager:
         if self.leads_data is None:
             return pd.DataFrame()
         
-        df = self.leads_data.copy()
+        df = self.leads_data.copy(deep=False)
         
         # Ensure required columns exist
         if 'follow_up_date' not in df.columns:
@@ -275,33 +462,11 @@ class LeadManager:
             df['status_updated_date'] = None
         
         today = datetime.now()
+        df['follow_up_date'] = self._scheduled_follow_up_dates(df, today)
         
-        # Calculate follow-up dates based on current status and schedule
-        for idx, row in df.iterrows():
-            current_status = row['lead_status']
-            
-            # Get follow-up schedule for this status
-            if current_status in self.follow_up_schedule:
-                days_to_add = self.follow_up_schedule[current_status]
-                
-                # Set follow-up date based on last contact or status update
-                if pd.notna(row['status_updated_date']):
-                    df.loc[idx, 'follow_up_date'] = row['status_updated_date'] + timedelta(days=days_to_add)
-                elif pd.notna(row['last_contact_date']):
-                    df.loc[idx, 'follow_up_date'] = row['last_contact_date'] + timedelta(days=days_to_add)
-                else:
-                    # If no contact date, use current time + schedule
-                    df.loc[idx, 'follow_up_date'] = today + timedelta(days=days_to_add)
-        
-        # Filter leads that need follow-up
-        overdue_leads = df[df['follow_up_date'] <= today]
-        upcoming_leads = df[(df['follow_up_date'] > today) & (df['follow_up_date'] <= today + timedelta(days=days_threshold))]
-        
-        # Combine and sort by urgency
-        all_follow_ups = pd.concat([overdue_leads, upcoming_leads])
-        all_follow_ups = all_follow_ups.sort_values(['follow_up_date', 'priority'], ascending=[True, False])
-        
-        return all_follow_ups
+        # Overdue and upcoming leads in one filter, sorted by urgency
+        due_mask = df['follow_up_date'] <= today + timedelta(days=days_threshold)
+        return df[due_mask].sort_values(['follow_up_date', 'priority'], ascending=[True, False], kind='mergesort')
     
     def get_overdue_follow_ups(self) -> pd.DataFrame:
         """
@@ -310,7 +475,7 @@ class LeadManager:
         if self.leads_data is None:
             return pd.DataFrame()
         
-        df = self.leads_data.copy()
+        df = self.leads_data
         
         if 'follow_up_date' not in df.columns:
             return pd.DataFrame()
@@ -339,23 +504,40 @@ class LeadManager:
         if self.leads_data is None:
             return {}
         
+        df = self.leads_data
         today = datetime.now()
         
-        # Get various follow-up categories
-        overdue = self.get_overdue_follow_ups()
-        urgent = self.get_urgent_follow_ups()
-        today_follow_ups = self.get_leads_needing_follow_up(days_threshold=1)
-        week_follow_ups = self.get_leads_needing_follow_up(days_threshold=7)
+        # One pass over the follow-up dates instead of four separate filtered frames; large
+        # categorical frames are classified by a fused numba kernel when it is installed
+        flags = follow_up_flags(df, self.follow_up_schedule, today, self.follow_up_alerts['overdue_days'])
+        if flags is not None:
+            overdue_mask = (flags & FOLLOW_UP_OVERDUE) > 0
+            urgent_mask = (flags & FOLLOW_UP_URGENT) > 0
+            today_mask = (flags & FOLLOW_UP_TODAY) > 0
+            week_mask = (flags & FOLLOW_UP_WEEK) > 0
+        else:
+            if 'follow_up_date' in df.columns:
+                overdue_threshold = today - timedelta(days=self.follow_up_alerts['overdue_days'])
+                overdue_mask = (df['follow_up_date'] <= overdue_threshold).to_numpy(dtype=bool)
+            else:
+                overdue_mask = np.zeros(len(df), dtype=bool)
+            urgent_mask = overdue_mask & df['priority'].isin(URGENT_PRIORITIES).to_numpy(dtype=bool)
+            scheduled = self._scheduled_follow_up_dates(df, today)
+            today_mask = (scheduled <= today + timedelta(days=1)).to_numpy(dtype=bool)
+            week_mask = (scheduled <= today + timedelta(days=7)).to_numpy(dtype=bool)
+        
+        # Only the overdue leads are materialized, for the breakdowns
+        overdue = df[overdue_mask]
         
         summary = {
-            'total_leads': len(self.leads_data),
-            'overdue_follow_ups': len(overdue),
-            'urgent_follow_ups': len(urgent),
-            'today_follow_ups': len(today_follow_ups),
-            'week_follow_ups': len(week_follow_ups),
-            'overdue_by_status': overdue['lead_status'].value_counts().to_dict(),
-            'overdue_by_priority': overdue['priority'].value_counts().to_dict(),
-            'overdue_by_assigned': overdue['assigned_to'].value_counts().to_dict() if 'assigned_to' in overdue.columns else {},
+            'total_leads': len(df),
+            'overdue_follow_ups': int(overdue_mask.sum()),
+            'urgent_follow_ups': int(urgent_mask.sum()),
+            'today_follow_ups': int(today_mask.sum()),
+            'week_follow_ups': int(week_mask.sum()),
+            'overdue_by_status': observed_counts(overdue['lead_status']),
+            'overdue_by_priority': observed_counts(overdue['priority']),
+            'overdue_by_assigned': observed_counts(overdue['assigned_to']) if 'assigned_to' in overdue.columns else {},
             'next_follow_up': None
         }
         
@@ -376,32 +558,37 @@ class LeadManager:
         if self.leads_data is None:
             return {}
         
+        # Value counts are computed once per frame and then kept up to date by the
+        # status update methods, so repeated summaries don't rescan every lead
+        if self._pipeline_counts is None:
+            self._pipeline_counts = {
+                col: Counter(self.leads_data[col].value_counts().to_dict())
+                for col in PIPELINE_COUNT_COLUMNS if col in self.leads_data.columns
+            }
+        counts = self._pipeline_counts
+        
         summary = {}
         
         # Total leads
         summary['total_leads'] = len(self.leads_data)
         
-        # Leads by status
-        status_counts = self.leads_data['lead_status'].value_counts().to_dict()
-        summary['leads_by_status'] = status_counts
+        # Leads by status (categories without leads, or emptied by updates, are left out)
+        summary['leads_by_status'] = {status: count for status, count in counts['lead_status'].most_common() if count > 0}
         
         # Leads by priority
-        priority_counts = self.leads_data['priority'].value_counts().to_dict()
-        summary['leads_by_priority'] = priority_counts
+        summary['leads_by_priority'] = {priority: count for priority, count in counts['priority'].most_common() if count > 0}
         
         # Leads by assigned sales person
-        if 'assigned_to' in self.leads_data.columns:
-            assigned_counts = self.leads_data['assigned_to'].value_counts().to_dict()
-            summary['leads_by_assigned_to'] = assigned_counts
+        if 'assigned_to' in counts:
+            summary['leads_by_assigned_to'] = {person: count for person, count in counts['assigned_to'].most_common() if count > 0}
         
         # Average lead score
         if 'lead_score' in self.leads_data.columns:
             summary['average_lead_score'] = self.leads_data['lead_score'].mean()
         
         # Conversion rates (if we have historical data)
-        if 'lead_status' in self.leads_data.columns:
-            total_contacted = len(self.leads_data[self.leads_data['lead_status'].isin(['Contacted', 'Qualified', 'Proposal Sent', 'Negotiation', 'Closed Won', 'Closed Lost'])])
-            summary['contact_rate'] = (total_contacted / summary['total_leads']) * 100 if summary['total_leads'] > 0 else 0
+        total_contacted = sum(counts['lead_status'][status] for status in CONTACTED_STATUSES)
+        summary['contact_rate'] = (total_contacted / summary['total_leads']) * 100 if summary['total_leads'] > 0 else 0
         
         return summary
     
@@ -419,30 +606,23 @@ class LeadManager:
                 if not output_path.endswith('.xlsx'):
                     output_path += '.xlsx'
             
-            # Try multiple Excel engines in order of preference
-            excel_engines = ['openpyxl', 'xlsxwriter', 'xlwt']
-            
-            for engine in excel_engines:
-                try:
-                    self.leads_data.to_excel(output_path, index=False, engine=engine)
-                    logger.info(f"Leads report exported to {output_path} using {engine}")
-                    return output_path
-                except ImportError:
-                    logger.warning(f"Excel engine '{engine}' not available, trying next...")
-                    continue
-                except Exception as e:
-                    logger.warning(f"Excel engine '{engine}' failed: {str(e)}, trying next...")
-                    continue
+            # write_excel streams rows and tries each installed engine in turn
+            try:
+                engine = write_excel(self.leads_data, output_path)
+                logger.info(f"Leads report exported to {output_path} using {engine}")
+                return output_path
+            except Exception as e:
+                logger.warning(f"Excel export failed: {str(e)}")
             
             # If all Excel engines fail, fallback to CSV
             logger.warning("All Excel engines failed, falling back to CSV export")
             csv_path = output_path.replace('.xlsx', '.csv')
-            self.leads_data.to_csv(csv_path, index=False)
+            self.leads_data.to_csv(csv_path, index=False, chunksize=CSV_WRITE_CHUNK_ROWS)
             logger.info(f"Exported to CSV instead: {csv_path}")
             return csv_path
             
         elif format.lower() == 'csv':
-            self.leads_data.to_csv(output_path, index=False)
+            self.leads_data.to_csv(output_path, index=False, chunksize=CSV_WRITE_CHUNK_ROWS)
             logger.info(f"Leads report exported to {output_path}")
             return output_path
         else:
@@ -456,32 +636,90 @@ class LeadManager:
             return False
         
         self.leads_data[field_name] = default_value
+        if field_name in PIPELINE_COUNT_COLUMNS:
+            self._pipeline_counts = None
         logger.info(f"Added custom field: {field_name}")
         return True
     
     def bulk_update_status(self, lead_ids: List[int], new_status: str, notes: str = "") -> int:
         """
-        Bulk update status for multiple leads
+        Bulk update status for multiple leads. Returns the number of leads updated, or 0 if
+        the changes could not be saved
         """
         if self.leads_data is None:
             return 0
         
-        updated_count = 0
-        for lead_id in lead_ids:
-            if self.update_lead_status(lead_id, new_status, notes):
-                updated_count += 1
+        if new_status not in self.lead_statuses:
+            return 0
+        
+        now = datetime.now()
+        updated_ids = self._apply_status_change(lead_ids, new_status, notes, now)
+        if not updated_ids:
+            return 0
+        
+        # Save once for the whole batch
+        if not self._save_leads_data({
+            'lead_ids': updated_ids,
+            'status': new_status,
+            'notes': notes,
+            'timestamp': now.isoformat()
+        }):
+            return 0
+        
+        logger.info(f"Bulk updated {len(updated_ids)} leads to status: {new_status}")
+        return len(updated_ids)
+    
+    def _apply_status_change(self, lead_ids: List[int], new_status: str, notes: str, now: datetime) -> List[int]:
+        """
+        Move the given leads to new_status in memory (used by bulk updates and when replaying
+        the event log) and return the ids of the leads that were found
+        """
+        mask = self.leads_data.index.isin(lead_ids)
+        if not mask.any():
+            return []
         
-        logger.info(f"Bulk updated {updated_count} leads to status: {new_status}")
-        return updated_count
+        self._ensure_status_columns()
+        updated_ids = self.leads_data.index[mask].tolist()
+        
+        # Update all selected leads at once; a failed write changes nothing
+        updates = {
+            'lead_status': new_status,
+            'status_updated_date': now,
+            'last_contact_date': now
+        }
+        if 'follow_up' in new_status.lower():
+            updates['follow_up_count'] = self.leads_data.loc[mask, 'follow_up_count'] + 1
+        self._write_leads(mask, updates)
+        
+        # Add the same note to every selected lead, now that their status has changed
+        self._pending_notes.extend((lead_id, now, new_status, notes) for lead_id in updated_ids)
+        
+        for lead_id in updated_ids:
+            self._auto_advance_status(lead_id, new_status)
+        
+        return updated_ids
     
     def get_lead_details(self, lead_id: int) -> Dict:
         """
         Get detailed information for a specific lead
         """
-        if self.leads_data is None or lead_id >= len(self.leads_data):
+        if self.leads_data is None or lead_id not in self.leads_data.index:
             return {}
         
-        lead_data = self.leads_data.iloc[lead_id].to_dict()
+        # Same id lookup as the status updates that recorded the notes
+        lead_data = self.leads_data.loc[lead_id].to_dict()
+        
+        # Render the notes table in the original text format, after any notes saved
+        # as text by older versions
+        lead_notes = self.get_lead_notes(lead_id)
+        note_lines = [
+            f"{timestamp.strftime('%Y-%m-%d %H:%M')}: {status} - {note}"
+            for timestamp, status, note in zip(lead_notes['timestamp'], lead_notes['status'], lead_notes['note'])
+        ]
+        legacy_notes = lead_data.get('status_notes')
+        if isinstance(legacy_notes, str) and legacy_notes:
+            note_lines.insert(0, legacy_notes)
+        lead_data['status_notes'] = "\n".join(note_lines)
         return lead_data
     
     def search_leads(self, search_term: str, search_fields: List[str] = None) -> pd.DataFrame:
@@ -500,14 +738,18 @@ class LeadManager:
         if not available_fields:
             return pd.DataFrame()
         
-        # Create search mask
-        search_mask = pd.Series([False] * len(self.leads_data))
-        
+        # The term is matched literally, so skip regex compilation; text columns are
+        # already strings and only need converting when they hold other values
+        field_masks = []
         for field in available_fields:
-            field_mask = self.leads_data[field].astype(str).str.contains(search_term, case=False, na=False)
-            search_mask = search_mask | field_mask
-        
-        return self.leads_data[search_mask]
+            values = self.leads_data[field]
+            if not pd.api.types.is_string_dtype(values):
+                values = values.astype(str)
+            field_masks.append(
+                values.str.contains(search_term, case=False, na=False, regex=False).to_numpy(dtype=bool)
+            )
+        
+        return self.leads_data[np.logical_or.reduce(field_masks)]
     
     def get_leads_needing_immediate_attention(self) -> pd.DataFrame:
         """
@@ -540,43 +782,40 @@ class LeadManager:
         if today_follow_ups.empty:
             return {'message': 'No follow-ups needed in the next 2 days'}
         
+        now = datetime.now()
+        
+        def column(name, default):
+            """Column values as an array, or the default for every lead if the column is missing"""
+            if name in today_follow_ups.columns:
+                return today_follow_ups[name].to_numpy()
+            return np.full(len(today_follow_ups), default, dtype=object)
+        
+        follow_up_dates = today_follow_ups['follow_up_date']
+        overdue = (follow_up_dates.notna() & (follow_up_dates <= now)).to_numpy()
+        urgent = np.isin(column('priority', None), ['High', 'Urgent'])
+        
+        # Lead details, built column-wise
+        lead_records = pd.DataFrame({
+            'id': today_follow_ups.index,
+            'name': column('full_name', 'Unknown'),
+            'phone': column('phone_number', ''),
+            'email': column('email', ''),
+            'status': column('lead_status', ''),
+            'priority': column('priority', ''),
+            'follow_up_date': follow_up_dates.to_numpy(),
+            'overdue': overdue
+        }).to_dict('records')
+        
         # Group by assigned sales person
+        assigned_to = pd.Series(column('assigned_to', 'Unassigned'))
         tasks_by_person = {}
-        
-        for _, lead in today_follow_ups.iterrows():
-            assigned_to = lead.get('assigned_to', 'Unassigned')
-            
-            if assigned_to not in tasks_by_person:
-                tasks_by_person[assigned_to] = {
-                    'total_tasks': 0,
-                    'overdue': 0,
-                    'urgent': 0,
-                    'leads': []
-                }
-            
-            tasks_by_person[assigned_to]['total_tasks'] += 1
-            
-            # Check if overdue
-            if pd.notna(lead.get('follow_up_date')) and lead['follow_up_date'] <= datetime.now():
-                tasks_by_person[assigned_to]['overdue'] += 1
-            
-            # Check if urgent
-            if lead.get('priority') in ['High', 'Urgent']:
-                tasks_by_person[assigned_to]['urgent'] += 1
-            
-            # Add lead details
-            lead_info = {
-                'id': lead.name,
-                'name': lead.get('full_name', 'Unknown'),
-                'phone': lead.get('phone_number', ''),
-                'email': lead.get('email', ''),
-                'status': lead.get('lead_status', ''),
-                'priority': lead.get('priority', ''),
-                'follow_up_date': lead.get('follow_up_date', ''),
-                'overdue': pd.notna(lead.get('follow_up_date')) and lead['follow_up_date'] <= datetime.now()
+        for person, positions in assigned_to.groupby(assigned_to, sort=False, dropna=False).indices.items():
+            tasks_by_person[person] = {
+                'total_tasks': len(positions),
+                'overdue': int(overdue[positions].sum()),
+                'urgent': int(urgent[positions].sum()),
+                'leads': [lead_records[i] for i in positions]
             }
-            
-            tasks_by_person[assigned_to]['leads'].append(lead_info)
         
         return tasks_by_person
 
@@ -0,0 +1,114 @@
+"""
+Persistence tests for LeadManager: save, reload in a new manager, then update
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import lead_manager
+from data_cleaner import LeadsDataCleaner
+from lead_manager import LeadManager
+
+
+def categorized_leads() -> pd.DataFrame:
+    """Small cleaned-style frame with categorical status, priority and assigned_to columns"""
+    df = pd.DataFrame({
+        'full_name': ['Asha Rao', 'Ravi Kumar', 'Meera Iyer'],
+        'lead_status': ['New Lead', 'New Lead', 'Interested'],
+        'priority': ['High', 'Low', 'Medium'],
+        'assigned_to': ['Asha', 'Ravi', 'Asha']
+    })
+    df = LeadsDataCleaner().optimize_dtypes(df)
+    df['assigned_to'] = df['assigned_to'].astype('category')
+    return df
+
+
+class LeadManagerPersistenceTest(unittest.TestCase):
+    def setUp(self):
+        # crm_data/ is relative to the working directory
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+        self.manager = LeadManager()
+        self.manager.leads_data = categorized_leads()
+        self.assertTrue(self.manager.update_lead_status(0, 'Initial Contact', 'first call'))
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def reloaded(self) -> LeadManager:
+        manager = LeadManager()
+        self.assertTrue(manager.load_saved_leads_data())
+        return manager
+
+    def test_update_after_reload(self):
+        manager = self.reloaded()
+        self.assertTrue(manager.update_lead_status(1, 'Initial Contact', 'called back'))
+        self.assertEqual(manager.bulk_update_status([1, 2], 'Interested', 'demo booked'), 2)
+
+        manager = self.reloaded()
+        self.assertEqual(manager.leads_data['lead_status'].tolist(), ['Initial Contact', 'Interested', 'Interested'])
+        self.assertEqual(manager.get_lead_notes(1)['note'].tolist(), ['called back', 'demo booked'])
+
+    def test_replay_after_failed_snapshot(self):
+        # The change is logged but its snapshot isn't written
+        with mock.patch.object(lead_manager.feather, 'write_feather', side_effect=OSError('disk full')):
+            self.assertFalse(self.manager.update_lead_status(1, 'Interested', 'asked for a demo'))
+        self.assertTrue(os.path.exists(lead_manager.EVENTS_PATH))
+
+        manager = self.reloaded()
+        self.assertEqual(manager.leads_data.at[1, 'lead_status'], 'Interested')
+        self.assertEqual(manager.get_lead_notes(1)['note'].tolist(), ['asked for a demo'])
+
+        # The next successful save includes the replayed change and clears the log
+        self.assertTrue(manager.update_lead_status(2, 'Member', 'joined'))
+        self.assertFalse(os.path.exists(lead_manager.EVENTS_PATH))
+        manager = self.reloaded()
+        self.assertEqual(manager.leads_data['lead_status'].tolist(), ['Initial Contact', 'Interested', 'Member'])
+        self.assertEqual(len(manager.get_lead_notes(1)), 1)
+
+    def test_replay_onto_parquet_snapshot(self):
+        # Snapshot in the earlier Parquet format plus a logged change not yet in it
+        self.manager.leads_data.to_parquet(lead_manager.PARQUET_SNAPSHOT_PATH)
+        os.remove(lead_manager.SNAPSHOT_PATH)
+        with mock.patch.object(lead_manager.feather, 'write_feather', side_effect=OSError('disk full')):
+            self.manager.bulk_update_status([1, 2], 'Proposal Sent', 'sent pricing')
+
+        manager = self.reloaded()
+        self.assertEqual(manager.leads_data['lead_status'].tolist(), ['Initial Contact', 'Proposal Sent', 'Proposal Sent'])
+        self.assertTrue(manager.update_lead_status(0, 'Member', 'joined'))
+
+
+class PipelineCountsTest(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_counts_follow_updates(self):
+        manager = LeadManager()
+        manager.leads_data = categorized_leads()
+        manager.get_sales_pipeline_summary()
+
+        manager.update_lead_status(0, 'Interested')
+        manager.bulk_update_status([1, 2], 'Member')
+        manager._write_leads([1], {'priority': 'Urgent', 'assigned_to': 'Ravi'})
+
+        rebuilt = LeadManager()
+        rebuilt.leads_data = manager.leads_data
+        self.assertEqual(manager.get_sales_pipeline_summary(), rebuilt.get_sales_pipeline_summary())
+        self.assertEqual(manager.get_sales_pipeline_summary()['leads_by_status'], {'Member': 2, 'Interested': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()